@@ -5,8 +5,13 @@
 
 import argparse
 import asyncio
+import functools
+import heapq
+import io
 import json
+import logging
 import re
+import time
 from collections import Counter
 from datetime import datetime
 from pathlib import Path
@@ -16,20 +21,74 @@ from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 
+try:
+    import jieba
+except ImportError:  # 可选依赖，缺失时退回正则切词
+    jieba = None
+
 import config
-from browser_helper import launch_browser, close_browser, navigate_to, ensure_login, ensure_login_on_page
+from browser_helper import (
+    launch_browser, close_browser, recycle_context, block_resources,
+    navigate_to, ensure_login, ensure_login_on_page, BrowserClosedError,
+)
 from utils import (
     random_delay, safe_click, extract_text, extract_attribute,
     parse_count, save_to_json, smooth_scroll, wait_for_any_selector, truncate_text,
+    split_selectors,
 )
+from daemon import daemon_running
+from ratelimit import AIMDLimiter
 
 console = Console()
 
+# 报告生成用到的正则与停用词
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]{2,4}')
+_CJK_WORD_RE = re.compile(r'[\u4e00-\u9fff]+')
+_DIGIT_RE = re.compile(r'\d+')
+_EMOJI_RE = re.compile(r'[^\w\s\u4e00-\u9fff]')
+_STOPWORDS = frozenset({
+    "什么", "怎么", "这个", "那个", "一个", "可以", "就是", "真的",
+    "大家", "自己", "不是", "没有", "已经", "还是", "我们", "他们",
+    "知道", "觉得", "因为", "所以", "但是", "而且", "或者", "如果",
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _init_jieba() -> bool:
+    """加载 jieba 词典（只加载一次），未安装 jieba 时返回 False"""
+    if jieba is None:
+        return False
+    jieba.setLogLevel(logging.WARNING)
+    jieba.initialize()
+    return True
+
+
+def _extract_keywords(text: str):
+    """
+    把文本切分成候选关键词（已过滤停用词）
+    优先用 jieba 分词；未安装时退回按 2-4 字的中文连续片段切分
+    """
+    if _init_jieba():
+        for word in jieba.cut(text):
+            if 2 <= len(word) <= 6 and word not in _STOPWORDS and _CJK_WORD_RE.fullmatch(word):
+                yield word
+    else:
+        for m in _CJK_RE.finditer(text):
+            word = m.group()
+            if word not in _STOPWORDS:
+                yield word
 
+
+@functools.lru_cache(maxsize=1)
 def _load_selectors() -> dict:
-    """加载选择器配置"""
+    """加载选择器配置（只读取一次，逗号分隔的选择器已拆成元组）"""
     with open(config.SELECTORS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        return split_selectors(json.load(f))
+
+
+def _url_path(href: str) -> str:
+    """去掉链接中的查询参数（xsec_token 等），得到笔记的稳定标识"""
+    return href.split("?", 1)[0] if href else ""
 
 
 async def _apply_filters(page, sort: str = "hot"):
@@ -121,7 +180,7 @@ async def search_keyword(page, keyword: str, sort: str = "hot"):
     selectors = _load_selectors()
 
     # 构建搜索 URL
-    search_url = config.XIAOHONGSHU_SEARCH.format(keyword=keyword)
+    search_url = config.search_url(keyword)
     console.print(f"  [cyan]搜索关键词: {keyword}[/cyan]")
 
     await navigate_to(page, search_url)
@@ -139,12 +198,21 @@ async def search_keyword(page, keyword: str, sort: str = "hot"):
     await _apply_filters(page, sort)
 
 
-async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
+async def scrape_note_list(
+    page, selectors: dict, count: int, elements_by_path: dict | None = None,
+) -> list[dict]:
     """
     从搜索结果页抓取笔记列表的基础信息
+
+    Args:
+        elements_by_path: 传入时按笔记路径（链接去掉查询参数）记录对应的卡片元素，
+            供弹窗回退时直接点击，免去重新查找
     """
     notes = []
-    note_selectors = selectors["search"]["note_item"].split(", ")
+    seen_paths: set[str] = set()
+    note_selectors = selectors["search"]["note_item"]
+    title_sels = selectors["search"].get("note_title", ("a.title",))
+    like_sels = selectors["search"].get("note_like_count", (".like-wrapper .count",))
 
     with Progress(
         SpinnerColumn(),
@@ -162,11 +230,11 @@ async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
             for sel in note_selectors:
                 try:
                     elements = await page.query_selector_all(sel)
-                except Exception as e:
-                    if "Target" in str(e) and "closed" in str(e):
-                        console.print("  [red]浏览器页面已关闭，停止抓取[/red]")
-                        return notes
-                    raise
+                except Exception:
+                    if not page.is_closed():
+                        raise
+                    console.print("  [red]浏览器页面已关闭，停止抓取[/red]")
+                    return notes
                 if elements:
                     note_elements = elements
                     break
@@ -181,12 +249,12 @@ async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
                     link_el = await element.query_selector("a")
                     href = await extract_attribute(link_el, "href") if link_el else ""
 
-                    # 跳过已抓取的
-                    if any(n.get("url") == href for n in notes):
+                    # 去掉 xsec_token 等查询参数作为笔记的唯一标识，跳过已抓取的
+                    url_path = _url_path(href)
+                    if url_path in seen_paths:
                         continue
 
                     # 获取标题
-                    title_sels = selectors["search"].get("note_title", "a.title").split(", ")
                     title_el = None
                     for ts in title_sels:
                         title_el = await element.query_selector(ts)
@@ -197,7 +265,6 @@ async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
                     title = await extract_text(title_el, "无标题")
 
                     # 获取互动数据（列表页可能只有点赞数）
-                    like_sels = selectors["search"].get("note_like_count", ".like-wrapper .count").split(", ")
                     like_el = None
                     for ls in like_sels:
                         like_el = await element.query_selector(ls)
@@ -208,9 +275,13 @@ async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
                     notes.append({
                         "title": title,
                         "url": href,
+                        "url_path": url_path,
                         "like_count": parse_count(like_text),
                         "scraped_at": datetime.now().isoformat(),
                     })
+                    seen_paths.add(url_path)
+                    if elements_by_path is not None and url_path:
+                        elements_by_path[url_path] = element
 
                     progress.update(task, description=f"抓取笔记中 ({len(notes)}/{count})...")
 
@@ -228,6 +299,105 @@ async def scrape_note_list(page, selectors: dict, count: int) -> list[dict]:
     return notes
 
 
+ERROR_TEXTS = ["当前笔记暂时无法浏览", "笔记不存在", "内容已被删除", "页面不存在"]
+
+
+# 一次 evaluate 提取详情页全部字段，避免逐字段往返 CDP
+# 每个字段按选择器顺序取第一个命中元素的文本，未命中返回 null
+_DETAIL_EXTRACT_JS = """
+    (cfg) => {
+        const pick = (sels) => {
+            for (const s of sels) {
+                const el = document.querySelector(s);
+                if (el) return (el.textContent || '').trim();
+            }
+            return null;
+        };
+        const tags = [];
+        for (const s of cfg.tags) {
+            for (const el of document.querySelectorAll(s)) {
+                tags.push((el.textContent || '').trim());
+            }
+        }
+        return {
+            pageTitle: document.title || '',
+            pageText: document.body ? document.body.innerText.substring(0, 500) : '',
+            title: pick(cfg.title),
+            content: pick(cfg.content),
+            like_count: pick(cfg.like_count),
+            collect_count: pick(cfg.collect_count),
+            comment_count: pick(cfg.comment_count),
+            publish_time: pick(cfg.publish_time),
+            author: pick(cfg.author_name),
+            tags: tags,
+        };
+    }
+"""
+
+_DETAIL_TEXT_FIELDS = ("title", "content", "publish_time", "author")
+_DETAIL_COUNT_FIELDS = ("like_count", "collect_count", "comment_count")
+_DETAIL_EXTRACT_KEYS = (
+    "title", "content", "like_count", "collect_count", "comment_count",
+    "tags", "publish_time", "author_name",
+)
+
+
+async def _extract_note_detail(page, detail_selectors: dict) -> dict:
+    """
+    从已打开的笔记详情（弹窗或独立详情页）中提取完整信息
+
+    Args:
+        page: 展示笔记详情的页面
+        detail_selectors: note_detail 选择器配置
+
+    Returns:
+        dict: 笔记详情数据
+    """
+    note_data = {}
+
+    await random_delay(0.5, 1)
+
+    cfg = {key: list(detail_selectors[key]) for key in _DETAIL_EXTRACT_KEYS}
+    raw = await page.evaluate(_DETAIL_EXTRACT_JS, cfg)
+
+    # 检测是否被风控拦截到验证页
+    if "验证" in raw["pageTitle"]:
+        console.print(f"    [yellow]⚠ 触发安全验证，跳过[/yellow]")
+        note_data["detail_status"] = "verify_required"
+        return note_data
+
+    # 检测是否为错误页面
+    if any(err in raw["pageText"] for err in ERROR_TEXTS):
+        console.print(f"    [yellow]⚠ 该笔记无法浏览，跳过[/yellow]")
+        note_data["detail_status"] = "web_restricted"
+        return note_data
+
+    for field in _DETAIL_TEXT_FIELDS:
+        if raw[field] is not None:
+            note_data[field] = raw[field]
+
+    for field in _DETAIL_COUNT_FIELDS:
+        if raw[field] is not None:
+            note_data[field] = parse_count(raw[field])
+
+    # 标签去重并保留页面上的出现顺序
+    tags = []
+    seen_tags = set()
+    for tag_text in raw["tags"]:
+        if not tag_text:
+            continue
+        if not tag_text.startswith("#"):
+            tag_text = f"#{tag_text}"
+        if tag_text in seen_tags:
+            continue
+        seen_tags.add(tag_text)
+        tags.append(tag_text)
+    note_data["tags"] = tags
+
+    note_data["detail_status"] = "ok"
+    return note_data
+
+
 async def scrape_note_detail_via_popup(page, note_element, selectors: dict) -> dict:
     """
     通过点击搜索结果中的笔记卡片弹出详情弹窗，抓取完整信息。
@@ -244,8 +414,6 @@ async def scrape_note_detail_via_popup(page, note_element, selectors: dict) -> d
     detail_selectors = selectors["note_detail"]
     note_data = {}
 
-    ERROR_TEXTS = ["当前笔记暂时无法浏览", "笔记不存在", "内容已被删除", "页面不存在"]
-
     try:
         # 滚动到笔记卡片使其可见
         try:
@@ -275,88 +443,24 @@ async def scrape_note_detail_via_popup(page, note_element, selectors: dict) -> d
 
         await random_delay(1.5, 2.5)
 
-        # 等待弹窗/详情页出现 — 依次检查多种容器
-        popup = None
-        for sel_key in ["popup_mask", "popup_container", "note_scroller"]:
-            sels = detail_selectors.get(sel_key, "").split(", ")
-            sels = [s for s in sels if s]
-            if sels:
-                popup = await wait_for_any_selector(page, sels, timeout=3000)
-            if popup:
-                break
+        # 等待弹窗/详情页出现 — 多种容器合并成一个选择器同时等待
+        popup_sels = [
+            sel
+            for sel_key in ("popup_mask", "popup_container", "note_scroller")
+            for sel in detail_selectors.get(sel_key, ())
+        ]
+        popup = await wait_for_any_selector(page, popup_sels, timeout=3000, state="attached")
 
         if not popup:
             console.print(f"    [yellow]弹窗/详情页未打开[/yellow]")
             return note_data
 
-        # 检测是否为错误页面
-        try:
-            page_text = await page.evaluate("() => document.body.innerText.substring(0, 500)")
-            if any(err in page_text for err in ERROR_TEXTS):
-                console.print(f"    [yellow]⚠ 该笔记无法浏览，跳过[/yellow]")
-                note_data["detail_status"] = "web_restricted"
-                return note_data
-        except Exception:
-            pass
-
-        await random_delay(0.5, 1)
-
         # 捕获弹窗/详情页的 URL（是笔记的独立链接）
         detail_url = page.url
         if "/explore/" in detail_url:
             note_data["detail_url"] = detail_url
 
-        # 抓取标题
-        title_sels = detail_selectors["title"].split(", ")
-        title_el = await wait_for_any_selector(page, title_sels, timeout=3000)
-        if title_el:
-            note_data["title"] = await extract_text(title_el, "")
-
-        # 抓取正文
-        content_sels = detail_selectors["content"].split(", ")
-        content_el = await wait_for_any_selector(page, content_sels, timeout=3000)
-        if content_el:
-            note_data["content"] = await extract_text(content_el, "")
-
-        # 抓取互动数据
-        for field, sel_key in [
-            ("like_count", "like_count"),
-            ("collect_count", "collect_count"),
-            ("comment_count", "comment_count"),
-        ]:
-            sels = detail_selectors[sel_key].split(", ")
-            el = await wait_for_any_selector(page, sels, timeout=2000)
-            if el:
-                text = await extract_text(el, "0")
-                note_data[field] = parse_count(text)
-
-        # 抓取标签
-        tag_sels = detail_selectors["tags"].split(", ")
-        tags = []
-        for sel in tag_sels:
-            tag_elements = await page.query_selector_all(sel)
-            for tag_el in tag_elements:
-                tag_text = await extract_text(tag_el)
-                if tag_text:
-                    tag_text = tag_text.strip()
-                    if not tag_text.startswith("#"):
-                        tag_text = f"#{tag_text}"
-                    tags.append(tag_text)
-        note_data["tags"] = list(set(tags))
-
-        # 抓取发布时间
-        time_sels = detail_selectors["publish_time"].split(", ")
-        time_el = await wait_for_any_selector(page, time_sels, timeout=2000)
-        if time_el:
-            note_data["publish_time"] = await extract_text(time_el, "")
-
-        # 抓取作者
-        author_sels = detail_selectors["author_name"].split(", ")
-        author_el = await wait_for_any_selector(page, author_sels, timeout=2000)
-        if author_el:
-            note_data["author"] = await extract_text(author_el, "")
-
-        note_data["detail_status"] = "ok"
+        note_data.update(await _extract_note_detail(page, detail_selectors))
 
     except Exception as e:
         console.print(f"    [yellow]抓取弹窗详情出错: {e}[/yellow]")
@@ -365,10 +469,68 @@ async def scrape_note_detail_via_popup(page, note_element, selectors: dict) -> d
     return note_data
 
 
+async def _open_note_page(page, note_url: str, title_sels: tuple[str, ...]):
+    """打开笔记详情页并等待标题出现"""
+    await page.goto(note_url, wait_until="domcontentloaded")
+    await wait_for_any_selector(page, title_sels, timeout=5000, state="attached")
+
+
+async def scrape_note_detail_direct(
+    page, note_url: str, selectors: dict, limiter: AIMDLimiter | None = None,
+) -> dict:
+    """
+    在详情标签页中直接打开笔记详情 URL 抓取完整信息，省去点击卡片、等待弹窗、关闭弹窗的往返。
+    部分笔记不带 xsec_token 时无法直接浏览，此时返回 detail_status="web_restricted"，
+    由调用方回退到弹窗方式。
+
+    Args:
+        page: 用于打开详情页的标签页（不要传搜索结果页）
+        note_url: 笔记链接（相对或绝对路径）
+        selectors: 选择器配置
+        limiter: 传入时按其节奏打开详情页，并只把打开页面、等待标题的耗时反馈给它
+            （提取前的随机停顿和页面内提取不计入）
+
+    Returns:
+        dict: 笔记详情数据
+    """
+    detail_selectors = selectors["note_detail"]
+    note_data = {}
+
+    if not note_url.startswith("http"):
+        note_url = f"https://www.xiaohongshu.com{note_url}"
+
+    try:
+        title_sels = detail_selectors["title"]
+        if limiter is None:
+            await _open_note_page(page, note_url, title_sels)
+        else:
+            async with limiter:
+                t0 = time.monotonic()
+                try:
+                    await _open_note_page(page, note_url, title_sels)
+                except Exception:
+                    await limiter.record_error()
+                    raise
+                await limiter.record_latency(time.monotonic() - t0)
+
+        if "/explore/" in page.url:
+            note_data["detail_url"] = page.url
+
+        note_data.update(await _extract_note_detail(page, detail_selectors))
+
+    except Exception as e:
+        if page.is_closed():
+            raise BrowserClosedError() from e
+        console.print(f"    [yellow]打开详情页出错: {e}[/yellow]")
+        note_data["detail_status"] = "error"
+
+    return note_data
+
+
 async def _close_detail_popup(page, detail_selectors: dict):
     """关闭笔记详情弹窗，回到搜索结果页"""
     # 方法1：点击 div.close-box（实测确认存在）
-    close_sel = detail_selectors.get("close_button", "div.close-box")
+    close_sel = ", ".join(detail_selectors.get("close_button", ("div.close-box",)))
     try:
         close_btn = await page.query_selector(close_sel)
         if close_btn and await close_btn.is_visible():
@@ -389,146 +551,319 @@ async def _close_detail_popup(page, detail_selectors: dict):
         pass
 
 
+# 一次调用取出卡片内第一个链接的 href
+_CARD_HREF_JS = "el => { const a = el.querySelector('a'); return a ? a.getAttribute('href') : null; }"
+
+
+async def _find_note_element(
+    page, note: dict, note_item_sels: tuple[str, ...], index: int, elements_by_path: dict,
+):
+    """
+    在搜索结果页中重新定位与 note 对应的笔记卡片元素
+    重新查询时顺带刷新 elements_by_path，后续笔记可直接命中
+    """
+    note_elements = []
+    for sel in note_item_sels:
+        note_elements = await page.query_selector_all(sel)
+        if note_elements:
+            break
+
+    for el in note_elements:
+        url_path = _url_path(await el.evaluate(_CARD_HREF_JS) or "")
+        if url_path:
+            elements_by_path[url_path] = el
+
+    # 方法1：通过 URL 路径匹配（字典查找，无需逐个读取卡片文本）
+    url_path = note.get("url_path") or _url_path(note.get("url", ""))
+    if url_path in elements_by_path:
+        return elements_by_path[url_path]
+
+    # 方法2：如果 URL 匹配失败，通过标题匹配
+    if note.get("title"):
+        for el in note_elements:
+            el_text = await extract_text(el, "")
+            if note["title"] in el_text:
+                return el
+
+    # 方法3：按位置（最后手段）
+    if index < len(note_elements):
+        return note_elements[index]
+
+    return None
+
+
+async def _cached_note_element(elements_by_path: dict, note: dict):
+    """取出列表抓取时记录的卡片元素；元素已脱离 DOM（列表被回收、页面已切换）时丢弃并返回 None"""
+    url_path = note.get("url_path", "")
+    el = elements_by_path.get(url_path)
+    if el is None:
+        return None
+    try:
+        if await el.evaluate("el => el.isConnected"):
+            return el
+    except Exception:
+        pass
+    elements_by_path.pop(url_path, None)
+    return None
+
+
+async def _open_page_pool(context, size: int) -> asyncio.Queue:
+    """预先打开 size 个详情标签页放入队列，供并发任务轮流复用"""
+    pool = asyncio.Queue()
+    for _ in range(size):
+        await pool.put(await context.new_page())
+    return pool
+
+
+async def _close_page_pool(pool: asyncio.Queue):
+    """关闭池中所有标签页"""
+    while not pool.empty():
+        page = pool.get_nowait()
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+
+async def _scrape_one(
+    pool: asyncio.Queue, limiter: AIMDLimiter, note: dict, selectors: dict, index: int, total: int,
+):
+    """
+    从标签页池取一个标签页，直接打开笔记详情 URL 抓取详情，并合并回 note
+    池的大小是并发上限，limiter 根据详情页加载耗时在上限内自适应调整实际并发和请求频率
+    浏览器关闭时抛出 BrowserClosedError，由调用方的 TaskGroup 取消其余任务
+    """
+    note_url = note.get("url", "")
+    if not note_url:
+        console.print(f"  [{index + 1}/{total}] [yellow]笔记缺少 URL，跳过[/yellow]")
+        return
+
+    page = await pool.get()
+    try:
+        console.print(f"  [{index + 1}/{total}] {truncate_text(note.get('title', ''), 40)}")
+        # 加载耗时和加载失败由 scrape_note_detail_direct 反馈给 limiter；验证页在提取时才能识别
+        detail_data = await scrape_note_detail_direct(page, note_url, selectors, limiter)
+        if detail_data.get("detail_status") == "verify_required":
+            await limiter.record_error()
+
+        # 合并详情数据到列表数据
+        for key, value in detail_data.items():
+            if value:
+                note[key] = value
+    finally:
+        await pool.put(page)
+
+
+async def _scrape_via_popup(
+    page, indexed_notes: list[tuple[int, dict]], selectors: dict, search_url: str, limiter: AIMDLimiter,
+    elements_by_path: dict,
+):
+    """
+    回退路径：直接打开详情页失败的笔记，在搜索结果页中逐篇点击弹窗抓取
+    弹窗共用同一个搜索页，只能串行执行
+
+    Args:
+        indexed_notes: (笔记在搜索结果中的位置, 笔记数据) 列表
+        elements_by_path: scrape_note_list 记录的 笔记路径 → 卡片元素，失效时才重新查找
+    """
+    detail_selectors = selectors["note_detail"]
+    note_item_sels = selectors["search"]["note_item"]
+
+    for i, (position, note) in enumerate(indexed_notes):
+        console.print(f"  [回退 {i + 1}/{len(indexed_notes)}] {truncate_text(note.get('title', ''), 40)}")
+
+        try:
+            # 优先复用列表阶段记录的元素，仍在 DOM 中就无需导航和重新查找
+            target_el = await _cached_note_element(elements_by_path, note)
+            if not target_el:
+                # 确保在搜索页上
+                if "search_result" not in page.url:
+                    await navigate_to(page, search_url, limiter=limiter)
+                    await random_delay(1, 2)
+                target_el = await _find_note_element(
+                    page, note, note_item_sels, position, elements_by_path,
+                )
+            if not target_el:
+                console.print(f"    [yellow]未找到对应元素，跳过[/yellow]")
+                continue
+
+            # 点击并抓取详情
+            detail_data = await scrape_note_detail_via_popup(page, target_el, selectors)
+
+            # 合并弹窗数据到列表数据
+            for key, value in detail_data.items():
+                if value:
+                    note[key] = value
+
+            # 关闭弹窗 / 回到搜索结果页
+            await _close_detail_popup(page, detail_selectors)
+
+        except Exception as e:
+            if page.is_closed():
+                console.print("  [red]浏览器已关闭，停止详情抓取[/red]")
+                break
+            console.print(f"    [yellow]详情抓取出错: {e}[/yellow]")
+
+        await random_delay(*config.SCRAPE_DELAY)
+
+
 def generate_analysis_report(notes: list[dict], keyword: str) -> str:
     """
     根据抓取的笔记数据，生成 Markdown 分析报告
     """
-    report_lines = [
-        f"# 小红书热门笔记分析报告",
-        f"",
-        f"- **搜索关键词**: {keyword}",
-        f"- **分析笔记数**: {len(notes)} 篇",
-        f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"",
-        f"---",
-        f"",
-    ]
+    buf = io.StringIO()
+    w = buf.write
+
+    w(
+        f"# 小红书热门笔记分析报告\n"
+        f"\n"
+        f"- **搜索关键词**: {keyword}\n"
+        f"- **分析笔记数**: {len(notes)} 篇\n"
+        f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"\n"
+        f"---\n"
+        f"\n"
+    )
 
     # ---- 1. 互动数据排行 ----
-    report_lines.append("## 📊 互动数据 Top 10")
-    report_lines.append("")
+    w("## 📊 互动数据 Top 10\n")
+    w("\n")
 
-    sorted_by_like = sorted(notes, key=lambda x: x.get("like_count", 0), reverse=True)[:10]
-    report_lines.append("| 排名 | 标题 | 👍 点赞 | ⭐ 收藏 | 💬 评论 |")
-    report_lines.append("|------|------|---------|---------|---------|")
+    # 只取前 10，用堆做部分排序（结果与 sorted(...)[:10] 一致）
+    sorted_by_like = heapq.nlargest(10, notes, key=lambda x: x.get("like_count", 0))
+    w("| 排名 | 标题 | 👍 点赞 | ⭐ 收藏 | 💬 评论 |\n")
+    w("|------|------|---------|---------|---------|\n")
     for i, note in enumerate(sorted_by_like, 1):
         title = truncate_text(note.get("title", "无标题"), 30)
         like = note.get("like_count", 0)
         collect = note.get("collect_count", 0)
         comment = note.get("comment_count", 0)
-        report_lines.append(f"| {i} | {title} | {like} | {collect} | {comment} |")
-    report_lines.append("")
+        w(f"| {i} | {title} | {like} | {collect} | {comment} |\n")
+    w("\n")
 
     # ---- 2. 高频关键词 ----
-    report_lines.append("## 🔑 高频关键词 Top 20")
-    report_lines.append("")
+    w("## 🔑 高频关键词 Top 20\n")
+    w("\n")
 
     all_text = " ".join(
         (note.get("title", "") + " " + note.get("content", ""))
         for note in notes
     )
-    # 简单的中文分词（按标点和空格分割，过滤短词）
-    words = re.findall(r'[\u4e00-\u9fff]{2,4}', all_text)
-    # 过滤常见停用词
-    stopwords = {"什么", "怎么", "这个", "那个", "一个", "可以", "就是", "真的",
-                 "大家", "自己", "不是", "没有", "已经", "还是", "我们", "他们",
-                 "知道", "觉得", "因为", "所以", "但是", "而且", "或者", "如果"}
-    filtered = [w for w in words if w not in stopwords]
-    word_freq = Counter(filtered).most_common(20)
-
-    report_lines.append("| 排名 | 关键词 | 出现次数 |")
-    report_lines.append("|------|--------|----------|")
+    word_freq = Counter(_extract_keywords(all_text)).most_common(20)
+
+    w("| 排名 | 关键词 | 出现次数 |\n")
+    w("|------|--------|----------|\n")
     for i, (word, freq) in enumerate(word_freq, 1):
-        report_lines.append(f"| {i} | {word} | {freq} |")
-    report_lines.append("")
+        w(f"| {i} | {word} | {freq} |\n")
+    w("\n")
 
     # ---- 3. 标题模式分析 ----
-    report_lines.append("## 📝 标题模式分析")
-    report_lines.append("")
+    w("## 📝 标题模式分析\n")
+    w("\n")
 
     titles = [note.get("title", "") for note in notes if note.get("title")]
-    avg_title_len = sum(len(t) for t in titles) / len(titles) if titles else 0
-    report_lines.append(f"- **平均标题长度**: {avg_title_len:.0f} 字")
-
-    # 标题中常见句式
-    question_titles = sum(1 for t in titles if "?" in t or "？" in t or "吗" in t)
-    number_titles = sum(1 for t in titles if re.search(r'\d+', t))
-    emoji_titles = sum(1 for t in titles if re.search(r'[^\w\s\u4e00-\u9fff]', t))
-    report_lines.append(f"- **疑问句标题**: {question_titles} 篇 ({question_titles/len(titles)*100:.0f}%)")
-    report_lines.append(f"- **含数字标题**: {number_titles} 篇 ({number_titles/len(titles)*100:.0f}%)")
-    report_lines.append(f"- **含 Emoji 标题**: {emoji_titles} 篇 ({emoji_titles/len(titles)*100:.0f}%)")
-    report_lines.append("")
+
+    # 单次遍历统计标题长度与常见句式
+    total_title_len = question_titles = number_titles = emoji_titles = 0
+    for t in titles:
+        total_title_len += len(t)
+        if "?" in t or "？" in t or "吗" in t:
+            question_titles += 1
+        if _DIGIT_RE.search(t):
+            number_titles += 1
+        if _EMOJI_RE.search(t):
+            emoji_titles += 1
+
+    avg_title_len = total_title_len / len(titles) if titles else 0
+    w(f"- **平均标题长度**: {avg_title_len:.0f} 字\n")
+
+    w(f"- **疑问句标题**: {question_titles} 篇 ({question_titles/len(titles)*100:.0f}%)\n")
+    w(f"- **含数字标题**: {number_titles} 篇 ({number_titles/len(titles)*100:.0f}%)\n")
+    w(f"- **含 Emoji 标题**: {emoji_titles} 篇 ({emoji_titles/len(titles)*100:.0f}%)\n")
+    w("\n")
 
     # ---- 4. 标签策略 ----
-    report_lines.append("## 🏷️ 标签使用策略")
-    report_lines.append("")
+    w("## 🏷️ 标签使用策略\n")
+    w("\n")
 
-    all_tags = []
+    # 直接累加到 Counter，不构造中间的标签列表
+    tag_counter = Counter()
+    tags_total = 0
     for note in notes:
-        all_tags.extend(note.get("tags", []))
-    tag_freq = Counter(all_tags).most_common(15)
+        tags = note.get("tags", [])
+        tag_counter.update(tags)
+        tags_total += len(tags)
+    tag_freq = tag_counter.most_common(15)
 
     if tag_freq:
-        avg_tags = sum(len(note.get("tags", [])) for note in notes) / len(notes) if notes else 0
-        report_lines.append(f"- **平均每篇标签数**: {avg_tags:.1f}")
-        report_lines.append(f"- **最热门标签**:")
-        report_lines.append("")
-        report_lines.append("| 标签 | 使用次数 |")
-        report_lines.append("|------|----------|")
+        avg_tags = tags_total / len(notes) if notes else 0
+        w(f"- **平均每篇标签数**: {avg_tags:.1f}\n")
+        w(f"- **最热门标签**:\n")
+        w("\n")
+        w("| 标签 | 使用次数 |\n")
+        w("|------|----------|\n")
         for tag, freq in tag_freq:
-            report_lines.append(f"| {tag} | {freq} |")
+            w(f"| {tag} | {freq} |\n")
     else:
-        report_lines.append("- 未抓取到标签数据")
-    report_lines.append("")
+        w("- 未抓取到标签数据\n")
+    w("\n")
 
     # ---- 5. 内容长度分析 ----
-    report_lines.append("## 📏 内容长度与互动率关系")
-    report_lines.append("")
-
-    notes_with_content = [n for n in notes if n.get("content")]
-    if notes_with_content:
-        short = [n for n in notes_with_content if len(n["content"]) < 200]
-        medium = [n for n in notes_with_content if 200 <= len(n["content"]) < 500]
-        long = [n for n in notes_with_content if len(n["content"]) >= 500]
-
-        def avg_engagement(group):
-            if not group:
-                return 0
-            return sum(n.get("like_count", 0) + n.get("collect_count", 0) + n.get("comment_count", 0) for n in group) / len(group)
-
-        report_lines.append("| 内容长度 | 笔记数 | 平均互动量 |")
-        report_lines.append("|----------|--------|------------|")
-        report_lines.append(f"| 短 (<200字) | {len(short)} | {avg_engagement(short):.0f} |")
-        report_lines.append(f"| 中 (200-500字) | {len(medium)} | {avg_engagement(medium):.0f} |")
-        report_lines.append(f"| 长 (>500字) | {len(long)} | {avg_engagement(long):.0f} |")
+    w("## 📏 内容长度与互动率关系\n")
+    w("\n")
+
+    # 单次遍历累计各长度区间的 [笔记数, 互动总量]：短 (<200) / 中 (200-500) / 长 (>=500)
+    buckets = [[0, 0], [0, 0], [0, 0]]
+    for n in notes:
+        content = n.get("content")
+        if not content:
+            continue
+        length = len(content)
+        idx = 0 if length < 200 else (1 if length < 500 else 2)
+        buckets[idx][0] += 1
+        buckets[idx][1] += n.get("like_count", 0) + n.get("collect_count", 0) + n.get("comment_count", 0)
+
+    if any(count for count, _ in buckets):
+        w("| 内容长度 | 笔记数 | 平均互动量 |\n")
+        w("|----------|--------|------------|\n")
+        for label, (count, eng_sum) in zip(("短 (<200字)", "中 (200-500字)", "长 (>500字)"), buckets):
+            w(f"| {label} | {count} | {eng_sum / count if count else 0:.0f} |\n")
     else:
-        report_lines.append("- 未抓取到正文内容，无法分析")
-    report_lines.append("")
+        w("- 未抓取到正文内容，无法分析\n")
+    w("\n")
 
     # ---- 6. 创作建议 ----
-    report_lines.append("## 💡 创作建议")
-    report_lines.append("")
+    w("## 💡 创作建议\n")
+    w("\n")
 
     if word_freq:
-        top_keywords = "、".join(w for w, _ in word_freq[:5])
-        report_lines.append(f"1. **关键词热点**: 围绕「{top_keywords}」等高频词创作")
-    report_lines.append(f"2. **标题长度**: 建议控制在 {max(10, int(avg_title_len - 5))}-{int(avg_title_len + 5)} 字")
+        top_keywords = "、".join(word for word, _ in word_freq[:5])
+        w(f"1. **关键词热点**: 围绕「{top_keywords}」等高频词创作\n")
+    w(f"2. **标题长度**: 建议控制在 {max(10, int(avg_title_len - 5))}-{int(avg_title_len + 5)} 字\n")
     if number_titles > len(titles) * 0.3:
-        report_lines.append("3. **数字标题**: 该领域含数字的标题效果好，建议使用具体数据")
+        w("3. **数字标题**: 该领域含数字的标题效果好，建议使用具体数据\n")
     if emoji_titles > len(titles) * 0.3:
-        report_lines.append("4. **Emoji 使用**: 该领域 Emoji 使用率高，建议适当添加")
+        w("4. **Emoji 使用**: 该领域 Emoji 使用率高，建议适当添加\n")
     if tag_freq:
         top_tags = "、".join(t for t, _ in tag_freq[:5])
-        report_lines.append(f"5. **推荐标签**: {top_tags}")
-    report_lines.append("")
+        w(f"5. **推荐标签**: {top_tags}\n")
 
-    return "\n".join(report_lines)
+    return buf.getvalue()
 
 
 async def analyze(keyword: str, count: int = 20, sort: str = "hot", output: str = None):
     """
     主分析流程
     """
+    # 守护进程占用着浏览器用户目录，无法再启动一个使用同一目录的浏览器
+    if await daemon_running():
+        console.print(Panel(
+            "🛰️ 后台浏览器守护进程（daemon.py）正在运行，浏览器数据目录被其占用\n"
+            "   笔记分析暂不支持交给守护进程执行，请先在其终端按 Ctrl+C 退出后重试",
+            style="yellow",
+        ))
+        return
+
     config.ensure_dirs()
     selectors = _load_selectors()
 
@@ -556,99 +891,69 @@ async def analyze(keyword: str, count: int = 20, sort: str = "hot", output: str
             console.print("[red]搜索失败（可能未登录），退出[/red]")
             return
 
-        # 抓取笔记列表
+        # 登录完成后再拦截图片等资源（登录二维码是图片）
+        if config.BLOCK_RESOURCES:
+            await block_resources(context)
+
+        # 抓取笔记列表，同时记录每篇笔记的卡片元素供弹窗回退复用
+        elements_by_path: dict = {}
         try:
-            notes = await scrape_note_list(page, selectors, count)
-        except Exception as e:
-            if "Target" in str(e) and "closed" in str(e):
-                console.print("[red]浏览器意外关闭，请重新运行[/red]")
-                return
-            raise
+            notes = await scrape_note_list(page, selectors, count, elements_by_path)
+        except Exception:
+            if not page.is_closed():
+                raise
+            console.print("[red]浏览器意外关闭，请重新运行[/red]")
+            return
 
         if not notes:
             console.print("[red]未抓取到任何笔记，请检查搜索关键词或网络[/red]")
             return
 
-        # 逐篇点击笔记弹窗抓取详情
-        console.print(f"\n[cyan]正在逐篇点击笔记抓取详情 ({len(notes)} 篇)...[/cyan]")
-        search_url = config.XIAOHONGSHU_SEARCH.format(keyword=keyword)
-        detail_selectors = selectors["note_detail"]
-        note_item_sels = selectors["search"]["note_item"].split(", ")
-
-        for i, note in enumerate(notes):
-            note_url = note.get('url', '')
-            # 构建完整笔记 URL 用于显示
-            if note_url and not note_url.startswith('http'):
-                full_note_url = f"https://www.xiaohongshu.com{note_url}"
-            else:
-                full_note_url = note_url
-            console.print(f"  [{i + 1}/{len(notes)}] {truncate_text(note.get('title', ''), 40)}")
-            if full_note_url:
-                console.print(f"    [dim]URL: {full_note_url}[/dim]")
-
+        # 并发打开笔记详情页抓取详情
+        console.print(
+            f"\n[cyan]正在抓取笔记详情 ({len(notes)} 篇, 并发 {config.DETAIL_CONCURRENCY})...[/cyan]"
+        )
+        search_url = config.search_url(keyword)
+        limiter = AIMDLimiter(
+            max_concurrency=config.DETAIL_CONCURRENCY,
+            rpm=config.DETAIL_RPM,
+            target_latency=config.DETAIL_TARGET_LATENCY,
+        )
+        browser_closed = False
+        for batch_start in range(0, len(notes), config.RECYCLE_EVERY):
+            # 每批结束后回收 Context，避免长时间抓取内存持续增长
+            if batch_start > 0:
+                context, page = await recycle_context(context)
+                elements_by_path.clear()  # 旧 Context 的元素句柄已失效
+                if config.BLOCK_RESOURCES:
+                    await block_resources(context)
+            batch = notes[batch_start:batch_start + config.RECYCLE_EVERY]
+            # 详情页在池中的标签页里打开，搜索页保持不动，回退时无需重新导航
+            pool = await _open_page_pool(context, config.DETAIL_CONCURRENCY)
             try:
-                # 确保在搜索页上（每次循环都回到搜索页）
-                current_url = page.url
-                if "search_result" not in current_url:
-                    await navigate_to(page, search_url)
-                    await random_delay(1, 2)
-
-                # 重新查找笔记元素（每次都查，因为 DOM 可能重建了）
-                note_elements = []
-                for sel in note_item_sels:
-                    note_elements = await page.query_selector_all(sel)
-                    if note_elements:
-                        break
-
-                # 找到与当前 note 对应的元素
-                target_el = None
-                note_url = note.get("url", "")
-
-                # 方法1：通过 URL 匹配
-                if note_url:
-                    for el in note_elements:
-                        link_el = await el.query_selector("a")
-                        if link_el:
-                            href = await extract_attribute(link_el, "href")
-                            if href and note_url in href:
-                                target_el = el
-                                break
-
-                # 方法2：如果 URL 匹配失败，通过标题匹配
-                if not target_el and note.get("title"):
-                    for el in note_elements:
-                        el_text = await extract_text(el, "")
-                        if note.get("title", "NOMATCH") in el_text:
-                            target_el = el
-                            break
-
-                # 方法3：按位置（最后手段）
-                if not target_el and i < len(note_elements):
-                    target_el = note_elements[i]
-
-                if not target_el:
-                    console.print(f"    [yellow]未找到对应元素，跳过[/yellow]")
-                    continue
-
-                # 点击并抓取详情
-                detail_data = await scrape_note_detail_via_popup(page, target_el, selectors)
-
-                # 合并弹窗数据到列表数据
-                if detail_data:
-                    for key, value in detail_data.items():
-                        if value:
-                            note[key] = value
-
-                # 关闭弹窗 / 回到搜索结果页
-                await _close_detail_popup(page, detail_selectors)
-
-            except Exception as e:
-                if "Target" in str(e) and "closed" in str(e):
-                    console.print("  [red]浏览器已关闭，停止详情抓取[/red]")
-                    break
-                console.print(f"    [yellow]详情抓取出错: {e}[/yellow]")
+                # 任一任务发现浏览器关闭时，TaskGroup 取消同批其余任务，不留下孤立任务
+                async with asyncio.TaskGroup() as tg:
+                    for i, note in enumerate(batch):
+                        tg.create_task(
+                            _scrape_one(pool, limiter, note, selectors, batch_start + i, len(notes))
+                        )
+            except* BrowserClosedError:
+                browser_closed = True
+            finally:
+                await _close_page_pool(pool)
+            if browser_closed:
+                # 保留已抓取的数据，继续保存和生成报告
+                console.print("  [red]浏览器已关闭，停止详情抓取[/red]")
+                break
 
-            await random_delay(*config.SCRAPE_DELAY)
+            # 直接打开失败的笔记（如缺少 xsec_token 被限制浏览）回退到弹窗方式
+            failed = [
+                (batch_start + i, n) for i, n in enumerate(batch)
+                if n.get("detail_status") != "ok"
+            ]
+            if failed:
+                console.print(f"  [cyan]{len(failed)} 篇笔记改用弹窗方式抓取...[/cyan]")
+                await _scrape_via_popup(page, failed, selectors, search_url, limiter, elements_by_path)
 
         # 保存原始数据
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -689,7 +994,7 @@ def _print_summary(notes: list[dict], keyword: str):
         seen_urls.add(url)
         unique_notes.append(note)
 
-    sorted_notes = sorted(unique_notes, key=lambda x: x.get("like_count", 0), reverse=True)[:5]
+    sorted_notes = heapq.nlargest(5, unique_notes, key=lambda x: x.get("like_count", 0))
     for note in sorted_notes:
         note_url = note.get("url", "")
         if note_url and not note_url.startswith("http"):
@@ -5,62 +5,88 @@
 """
 
 import asyncio
+import functools
 import json
+import os
+import shutil
 import sys
+import time
 from pathlib import Path
 
 from playwright.async_api import async_playwright, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from rich.console import Console
 from rich.panel import Panel
 
 import config
-from utils import random_delay, wait_for_any_selector
+from utils import random_delay, wait_for_any_selector, split_selectors
 
 console = Console()
 
 
+class BrowserClosedError(Exception):
+    """
+    页面 / Context / 浏览器已被关闭
+    Playwright 对此只抛出通用的 Error，由调用方结合 page.is_closed() 判断后转换为本异常
+    """
+
+
+@functools.lru_cache(maxsize=1)
 def _load_selectors() -> dict:
-    """加载选择器配置"""
+    """加载选择器配置（只读取一次，逗号分隔的选择器已拆成元组）"""
     with open(config.SELECTORS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        return split_selectors(json.load(f))
 
 
 # ============================================================
 # 浏览器启动与关闭
 # ============================================================
 
-async def launch_browser() -> tuple[BrowserContext, Page]:
-    """
-    启动浏览器并返回 context 和 page
-    使用持久化 Context + Chrome channel，复用登录态
-    """
-    config.ensure_dirs()
-
-    console.print(Panel("🚀 正在启动浏览器...", style="blue"))
+@functools.lru_cache(maxsize=1)
+def _has_chrome() -> bool:
+    """探测本机是否安装了 Google Chrome（结果缓存），避免无 Chrome 时白等一次启动失败"""
+    if shutil.which("google-chrome") or shutil.which("google-chrome-stable") or shutil.which("chrome"):
+        return True
+    if sys.platform == "darwin":
+        return Path("/Applications/Google Chrome.app").exists()
+    if sys.platform == "win32":
+        for env in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA"):
+            base = os.environ.get(env)
+            if base and (Path(base) / "Google/Chrome/Application/chrome.exe").exists():
+                return True
+        return False
+    return Path("/opt/google/chrome/chrome").exists()
 
-    playwright = await async_playwright().start()
 
-    try:
-        context = await playwright.chromium.launch_persistent_context(
-            user_data_dir=str(config.BROWSER_USER_DATA_DIR),
-            channel="chrome",
-            headless=False,
-            viewport={
-                "width": config.VIEWPORT_WIDTH,
-                "height": config.VIEWPORT_HEIGHT,
-            },
-            user_agent=config.USER_AGENT,
-            locale="zh-CN",
-            timezone_id="Asia/Shanghai",
-            ignore_default_args=["--enable-automation"],
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-infobars",
-                "--no-first-run",
-            ],
-        )
-    except Exception as e:
-        console.print(f"  [yellow]Chrome 通道启动失败 ({e})，回退到 Chromium[/yellow]")
+async def _launch_context(playwright) -> BrowserContext:
+    """启动持久化 Context（优先 Chrome channel，未安装或失败时回退 Chromium）并注入反检测脚本"""
+    context = None
+    if _has_chrome():
+        try:
+            context = await playwright.chromium.launch_persistent_context(
+                user_data_dir=str(config.BROWSER_USER_DATA_DIR),
+                channel="chrome",
+                headless=False,
+                viewport={
+                    "width": config.VIEWPORT_WIDTH,
+                    "height": config.VIEWPORT_HEIGHT,
+                },
+                user_agent=config.USER_AGENT,
+                locale="zh-CN",
+                timezone_id="Asia/Shanghai",
+                ignore_default_args=["--enable-automation"],
+                args=[
+                    "--disable-blink-features=AutomationControlled",
+                    "--disable-infobars",
+                    "--no-first-run",
+                ],
+            )
+        except Exception as e:
+            console.print(f"  [yellow]Chrome 通道启动失败 ({e})，回退到 Chromium[/yellow]")
+    else:
+        console.print("  [dim]未检测到 Chrome，使用 Chromium[/dim]")
+
+    if context is None:
         context = await playwright.chromium.launch_persistent_context(
             user_data_dir=str(config.BROWSER_USER_DATA_DIR),
             headless=False,
@@ -90,12 +116,47 @@ async def launch_browser() -> tuple[BrowserContext, Page]:
         );
     """)
 
+    # 统一默认超时，避免未显式指定 timeout 的操作默认等待 30 秒
+    context.set_default_timeout(config.DEFAULT_TIMEOUT)
+    context.set_default_navigation_timeout(config.NAVIGATION_TIMEOUT)
+
+    context._playwright_instance = playwright
+    return context
+
+
+async def launch_browser() -> tuple[BrowserContext, Page]:
+    """
+    启动浏览器并返回 context 和 page
+    使用持久化 Context + Chrome channel，复用登录态
+    """
+    config.ensure_dirs()
+
+    console.print(Panel("🚀 正在启动浏览器...", style="blue"))
+
+    playwright = await async_playwright().start()
+    context = await _launch_context(playwright)
+
     pages = context.pages
     page = pages[0] if pages else await context.new_page()
 
     console.print("  [green]✓ 浏览器已启动[/green]")
 
-    context._playwright_instance = playwright
+    return context, page
+
+
+async def recycle_context(context: BrowserContext) -> tuple[BrowserContext, Page]:
+    """
+    关闭并重新打开持久化 Context，释放长时间运行累积的内存
+    登录态保存在 user_data_dir 中，重新打开即可复用
+    """
+    playwright = context._playwright_instance
+    console.print("  [dim]回收浏览器 Context...[/dim]")
+
+    await context.close()
+    context = await _launch_context(playwright)
+
+    pages = context.pages
+    page = pages[0] if pages else await context.new_page()
     return context, page
 
 
@@ -110,10 +171,39 @@ async def close_browser(context: BrowserContext):
         console.print(f"  [yellow]关闭浏览器时出错: {e}[/yellow]")
 
 
-async def navigate_to(page: Page, url: str, wait_until: str = "domcontentloaded"):
-    """安全导航到指定 URL"""
+async def block_resources(context: BrowserContext):
+    """
+    拦截抓取用不到的资源请求（见 config.BLOCKED_RESOURCE_TYPES）
+    需在登录完成后调用，否则登录二维码图片也会被拦截
+    """
+    blocked = frozenset(config.BLOCKED_RESOURCE_TYPES)
+
+    async def _handle(route):
+        if route.request.resource_type in blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", _handle)
+
+
+async def navigate_to(page: Page, url: str, wait_until: str = "domcontentloaded", limiter=None):
+    """
+    安全导航到指定 URL
+    传入 limiter（ratelimit.AIMDLimiter）时按其节奏发起请求，并反馈加载耗时
+    """
     console.print(f"  [dim]导航到: {url[:80]}[/dim]")
-    await page.goto(url, wait_until=wait_until)
+    if limiter is None:
+        await page.goto(url, wait_until=wait_until)
+    else:
+        async with limiter:
+            t0 = time.monotonic()
+            try:
+                await page.goto(url, wait_until=wait_until)
+            except PlaywrightTimeoutError:
+                await limiter.record_error()
+                raise
+            await limiter.record_latency(time.monotonic() - t0)
     await random_delay(*config.PAGE_LOAD_WAIT)
 
 
@@ -121,90 +211,173 @@ async def navigate_to(page: Page, url: str, wait_until: str = "domcontentloaded"
 # 登录检测（内部函数）
 # ============================================================
 
+# 登录弹窗的唯一定义：可见的二维码，或含登录文案、且定位为 fixed/absolute/高 z-index 的可见弹窗容器
+# 以下常量注入 _LOGIN_PROBE_JS，所有弹窗检测（_has_login_popup、轮询信号）都经由该脚本
+_QR_SELECTOR = 'img[src*="qrcode"], .qrcode-img, canvas.qr-code'
+_POPUP_ROOT_SELECTOR = '[class*="login"], [class*="modal"], [class*="popup"], [class*="mask"], [role="dialog"]'
+_LOGIN_TEXTS = ("扫码登录", "手机号登录", "密码登录", "短信登录", "其他登录方式")
+
+# 一次 evaluate 同时完成登录弹窗检测和用户元素检测，减少轮询时的 CDP 往返
+_LOGIN_PROBE_JS = """
+    () => {
+        const hasPopup = (() => {
+            // 只查询可能是弹窗根节点的元素和二维码，而不是遍历页面上所有 div
+            const qrSel = %s;
+            const candidates = document.querySelectorAll(%s + ', ' + qrSel);
+            const loginTexts = %s;
+            for (const el of candidates) {
+                // 不可见的跳过（getClientRects 对 fixed 元素同样有效，offsetParent 则恒为 null）
+                if (!el.getClientRects().length) continue;
+                if (el.matches(qrSel)) return true;
+                // textContent 不触发布局，比 innerText 快
+                const text = el.textContent || '';
+                if (!loginTexts.some(t => text.includes(t))) continue;
+                // 只对命中文本的候选读取样式，确认是弹窗（fixed/absolute/高 z-index）
+                const style = window.getComputedStyle(el);
+                const zIndex = parseInt(style.zIndex) || 0;
+                if (zIndex > 100 || style.position === 'fixed' || style.position === 'absolute') {
+                    return true;
+                }
+            }
+            return false;
+        })();
+
+        // 检查是否有显示用户名的元素
+        const userEl = document.querySelector('.user-name, .nickname, .name');
+        const hasUserEl = !!(userEl && userEl.innerText && userEl.innerText.length > 0);
+
+        return { hasPopup, hasUserEl };
+    }
+""" % (
+    json.dumps(_QR_SELECTOR),
+    json.dumps(_POPUP_ROOT_SELECTOR),
+    json.dumps(_LOGIN_TEXTS, ensure_ascii=False),
+)
+
+# 在浏览器内轮询的登录信号（page.wait_for_function 使用，无需 Python 端逐次往返）
+# 登录完成：没有登录弹窗且页面显示用户名
+_LOGIN_DONE_JS = f"() => {{ const p = ({_LOGIN_PROBE_JS})(); return !p.hasPopup && p.hasUserEl; }}"
+# 登录弹窗已消失
+_POPUP_GONE_JS = f"() => !({_LOGIN_PROBE_JS})().hasPopup"
+
+
+# 表示已登录的 cookie 名（a1 匿名访问也会下发，不计入）
+_AUTH_COOKIE_NAMES = frozenset({"web_session", "galaxy_creator_session_id", "xsecappid"})
+# 登录成功后服务端下发的会话 cookie（a1 等匿名访问也会有）
+_SESSION_COOKIE_NAMES = frozenset({"web_session"})
+
+
+async def _login_probe(page: Page) -> dict:
+    """
+    执行一次登录探测，返回 {"hasPopup": bool, "hasUserEl": bool}
+    页面不可用（导航中、已关闭）时两项都视为 False
+    """
+    try:
+        return await page.evaluate(_LOGIN_PROBE_JS)
+    except Exception:
+        return {"hasPopup": False, "hasUserEl": False}
+
+
 async def _has_login_popup(page: Page) -> bool:
     """
     检测当前页面是否有登录弹窗
     这是最可靠的「未登录」信号 — 如果有登录弹窗，一定没登录
     """
-    try:
-        return await page.evaluate("""
-            () => {
-                // 查找含有登录相关文本的弹窗
-                const loginTexts = ['扫码登录', '手机号登录', '密码登录', '短信登录', '其他登录方式'];
-                const allElements = document.querySelectorAll('div, section, form');
-                for (const el of allElements) {
-                    if (el.offsetParent === null) continue;
-                    const text = el.innerText || '';
-                    if (loginTexts.some(t => text.includes(t))) {
-                        const style = window.getComputedStyle(el);
-                        const zIndex = parseInt(style.zIndex) || 0;
-                        // 确认是弹窗（fixed/absolute/高 z-index）
-                        if (zIndex > 100 || style.position === 'fixed' || style.position === 'absolute') {
-                            return true;
-                        }
-                        let parent = el.parentElement;
-                        while (parent) {
-                            const pStyle = window.getComputedStyle(parent);
-                            if (pStyle.position === 'fixed' || parseInt(pStyle.zIndex) > 100) {
-                                return true;
-                            }
-                            parent = parent.parentElement;
-                        }
-                    }
-                }
-                // 检查 QR 码
-                const qrImgs = document.querySelectorAll('img[src*="qrcode"], .qrcode-img, canvas.qr-code');
-                for (const img of qrImgs) {
-                    if (img.offsetParent !== null) return true;
-                }
-                return false;
-            }
-        """)
-    except Exception:
-        return False
+    return (await _login_probe(page))["hasPopup"]
 
 
 async def _is_logged_in(page: Page) -> bool:
     """
     在当前页面检测是否已登录
     使用反向检测优先：有登录弹窗 → 一定没登录
-    然后正向检测：cookie 中有 auth token → 已登录
+    然后正向检测：页面显示用户名 / cookie 中有 auth token → 已登录
     """
+    probe = await _login_probe(page)
+
     # 反向检测：如果有登录弹窗 → 未登录
-    has_popup = await _has_login_popup(page)
-    if has_popup:
+    if probe["hasPopup"]:
         return False
 
+    # 正向检测：页面上已显示用户名，无需再查 cookie
+    if probe["hasUserEl"]:
+        return True
+
     # 正向检测：检查 cookie
+    return not _AUTH_COOKIE_NAMES.isdisjoint(await _cookie_names(page))
+
+
+async def _cookie_names(page: Page) -> set[str]:
+    """小红书域名下所有非空 cookie 的名字（一次 CDP 调用）"""
     try:
         cookies = await page.context.cookies("https://www.xiaohongshu.com")
-        auth_cookie_names = ["web_session", "galaxy_creator_session_id", "xsecappid", "a1"]
-        for cookie in cookies:
-            if cookie["name"] in auth_cookie_names and cookie["value"]:
-                return True
+        return {c["name"] for c in cookies if c["value"]}
     except Exception:
-        pass
+        return set()
 
-    # 备用正向检测：用 JS 检查 localStorage 或页面状态
-    try:
-        result = await page.evaluate("""
-            () => {
-                // 检查是否有显示用户名的元素
-                const userEl = document.querySelector('.user-name, .nickname, .name');
-                if (userEl && userEl.innerText && userEl.innerText.length > 0) return true;
-
-                // 检查是否有登录按钮（有 → 未登录）
-                const allButtons = document.querySelectorAll('button, .login-btn');
-                for (const btn of allButtons) {
-                    if (btn.textContent && btn.textContent.trim() === '登录') return false;
-                }
 
-                return false;
-            }
-        """)
-        return result
-    except Exception:
+async def _login_snapshot(page: Page) -> tuple[dict, set[str]]:
+    """
+    并发执行登录探测和 cookie 读取，返回 (probe, cookie_names)
+    两者是互不依赖的 CDP 调用，并发后只花一次往返的时间
+    用于确定两者都需要的场景；只需快速判断时用 _is_logged_in（探测命中可省去 cookie 调用）
+    """
+    probe, cookie_names = await asyncio.gather(_login_probe(page), _cookie_names(page))
+    return probe, cookie_names
+
+
+def _logged_in_from(probe: dict, cookie_names: set[str]) -> bool:
+    """根据探测结果和 cookie 判断是否已登录，规则与 _is_logged_in 相同"""
+    return not probe["hasPopup"] and (probe["hasUserEl"] or not _AUTH_COOKIE_NAMES.isdisjoint(cookie_names))
+
+
+async def _wait_login_signal(page: Page, signal_js: str, timeout: float) -> bool:
+    """
+    等待登录信号，最多 timeout 秒，任一条件满足即返回 True：
+    - 浏览器内按 1 秒间隔轮询 signal_js 返回 true
+    - 小红书接口响应下发了 web_session cookie
+    超时返回 False
+    """
+    session_set = asyncio.Event()
+
+    async def on_response(response):
+        if "xiaohongshu.com" not in response.url:
+            return
+        try:
+            cookie = await response.header_value("set-cookie")
+        except Exception:
+            return
+        if cookie and "web_session=" in cookie:
+            session_set.set()
+
+    page.context.on("response", on_response)
+    fn_task = asyncio.create_task(
+        page.wait_for_function(signal_js, polling=1000, timeout=timeout * 1000)
+    )
+    ev_task = asyncio.create_task(session_set.wait())
+    tasks = (fn_task, ev_task)
+    deadline = time.monotonic() + timeout
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0, deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                # wait_for_function 超时或页面导航出错时继续等 cookie 信号直到超时
+                if task.exception() is None:
+                    return True
         return False
+    finally:
+        page.context.remove_listener("response", on_response)
+        for task in tasks:
+            if task.done():
+                if not task.cancelled():
+                    task.exception()  # 取走异常，避免未处理的任务异常告警
+            else:
+                task.cancel()
 
 
 # ============================================================
@@ -250,30 +423,33 @@ async def ensure_login(page: Page, timeout: int = 180) -> bool:
         style="yellow",
     ))
 
-    elapsed = 0
-    poll_interval = 3
-    while elapsed < timeout:
-        await asyncio.sleep(poll_interval)
-        elapsed += poll_interval
+    deadline = time.monotonic() + timeout
+    tick = 15
+    while (remaining := deadline - time.monotonic()) > 0:
+        # 等待浏览器内的登录信号
+        if await _wait_login_signal(page, _LOGIN_DONE_JS, min(tick, remaining)):
+            console.print(Panel("✅ 登录成功！Session 已保存", style="green"))
+            return True
 
-        # 检查是否登录成功
-        logged_in = await _is_logged_in(page)
-        if logged_in:
+        # 每 15 秒做一次含 cookie 的完整检测，探测结果和 cookie 同时用于判断是否需要刷新
+        probe, cookie_names = await _login_snapshot(page)
+        if _logged_in_from(probe, cookie_names):
             console.print(Panel("✅ 登录成功！Session 已保存", style="green"))
             return True
 
-        # 每 15 秒提示一次 + 刷新页面（扫码后可能需要刷新）
-        if elapsed % 15 == 0:
-            remaining = timeout - elapsed
+        # 每 15 秒提示一次
+        remaining = int(deadline - time.monotonic())
+        if remaining > 0:
             console.print(f"  [dim]等待登录中... 剩余 {remaining} 秒[/dim]")
+
+            # 仍显示登录弹窗且还没有会话 cookie → 用户可能正在扫码，刷新会让二维码失效
+            if probe["hasPopup"] and _SESSION_COOKIE_NAMES.isdisjoint(cookie_names):
+                continue
+
+            # 无弹窗却未登录（需刷新触发弹窗），或已拿到会话但页面未更新 → 刷新
+            # 刷新后不再单独检测，回到循环开头由浏览器内轮询发现登录状态
             try:
                 await page.reload(wait_until="domcontentloaded")
-                await random_delay(2, 3)
-                # 刷新后再检测
-                logged_in = await _is_logged_in(page)
-                if logged_in:
-                    console.print(Panel("✅ 登录成功！Session 已保存", style="green"))
-                    return True
             except Exception:
                 pass
 
@@ -297,18 +473,14 @@ async def ensure_login_on_page(page: Page, timeout: int = 120) -> bool:
         style="yellow",
     ))
 
-    elapsed = 0
-    poll_interval = 3
-    while elapsed < timeout:
-        await asyncio.sleep(poll_interval)
-        elapsed += poll_interval
-
-        has_popup = await _has_login_popup(page)
-        if not has_popup:
-            # 弹窗消失，验证登录
+    deadline = time.monotonic() + timeout
+    tick = 15
+    while (remaining := deadline - time.monotonic()) > 0:
+        # 在浏览器内等待弹窗消失（或服务端下发登录 cookie），最多等一个提示周期
+        if await _wait_login_signal(page, _POPUP_GONE_JS, min(tick, remaining)):
+            # 弹窗消失，验证登录（探测与 cookie 并发读取）
             await random_delay(1, 2)
-            logged_in = await _is_logged_in(page)
-            if logged_in:
+            if _logged_in_from(*await _login_snapshot(page)):
                 console.print(Panel("✅ 登录成功！继续执行...", style="green"))
                 return True
             # 弹窗关了但没登录，刷新试试
@@ -317,11 +489,11 @@ async def ensure_login_on_page(page: Page, timeout: int = 120) -> bool:
                 await random_delay(2, 3)
             except Exception:
                 pass
+            continue
 
-        if elapsed % 15 == 0:
-            remaining = timeout - elapsed
-            if remaining > 0:
-                console.print(f"  [dim]等待登录中... 剩余 {remaining} 秒[/dim]")
+        remaining = int(deadline - time.monotonic())
+        if remaining > 0:
+            console.print(f"  [dim]等待登录中... 剩余 {remaining} 秒[/dim]")
 
     console.print(Panel("❌ 登录超时", style="red"))
     return False
@@ -333,6 +505,18 @@ async def ensure_login_on_page(page: Page, timeout: int = 120) -> bool:
 
 async def main():
     """独立运行：启动浏览器并等待用户登录"""
+    # 延迟导入：daemon 依赖本模块
+    from daemon import daemon_running
+
+    # 守护进程运行时浏览器数据目录被其占用，且它启动时已完成登录
+    if await daemon_running():
+        console.print(Panel(
+            "🛰️ 后台浏览器守护进程（daemon.py）正在运行，登录态由它维护\n"
+            "   如需重新登录，请先在其终端按 Ctrl+C 退出后重试",
+            style="yellow",
+        ))
+        return
+
     console.print(Panel(
         "🌟 小红书 Skill - 浏览器登录助手\n"
         "   首次使用请在打开的浏览器中登录小红书",
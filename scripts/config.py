@@ -5,6 +5,7 @@
 
 import os
 from pathlib import Path
+from urllib.parse import quote
 
 # ============================================================
 # 路径配置
@@ -25,6 +26,9 @@ RESOURCES_DIR = PROJECT_ROOT / "resources"
 # 选择器配置文件
 SELECTORS_FILE = RESOURCES_DIR / "selectors.json"
 
+# 后台浏览器守护进程（daemon.py）监听的 Unix socket
+DAEMON_SOCKET = PROJECT_ROOT / ".daemon.sock"
+
 # ============================================================
 # 小红书 URL 配置
 # ============================================================
@@ -34,6 +38,7 @@ XIAOHONGSHU_HOME = "https://www.xiaohongshu.com"
 
 # 小红书搜索页 URL 模板
 XIAOHONGSHU_SEARCH = "https://www.xiaohongshu.com/search_result?keyword={keyword}&type=51"
+_SEARCH_PRE, _SEARCH_POST = XIAOHONGSHU_SEARCH.split("{keyword}")
 
 # 小红书创作者中心 - 发布笔记
 XIAOHONGSHU_PUBLISH = "https://creator.xiaohongshu.com/publish/publish"
@@ -69,6 +74,19 @@ PAGE_TURN_DELAY = (3, 6)
 # 搜索结果抓取间隔
 SCRAPE_DELAY = (2, 4)
 
+# ============================================================
+# 超时配置（毫秒）
+# ============================================================
+
+# 元素等待、点击等操作的默认超时
+DEFAULT_TIMEOUT = 5000
+
+# 页面导航的默认超时
+NAVIGATION_TIMEOUT = 30000
+
+# 输入标签后等待话题建议出现的时间（输入后已有 1-2 秒停顿，建议通常已经弹出）
+TAG_SUGGESTION_TIMEOUT = 1500
+
 # ============================================================
 # 浏览器配置
 # ============================================================
@@ -84,6 +102,11 @@ USER_AGENT = (
     "Chrome/121.0.0.0 Safari/537.36"
 )
 
+# 抓取时拦截不需要的资源（图片、视频、字体），减少带宽和内存占用
+# 调试时可设为 False 查看完整页面；样式表不拦截，元素可见性判断依赖它
+BLOCK_RESOURCES = True
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
 # ============================================================
 # 抓取配置
 # ============================================================
@@ -97,6 +120,18 @@ MAX_ARTICLE_COUNT = 100
 # 每页笔记数量（用于计算翻页）
 ARTICLES_PER_PAGE = 20
 
+# 详情页并发抓取数（同时打开的标签页数量，过高容易触发风控）
+DETAIL_CONCURRENCY = 4
+
+# 每抓取多少篇详情回收一次浏览器 Context（限制 Playwright 内存增长）
+RECYCLE_EVERY = 25
+
+# 详情页自适应限速（见 ratelimit.AIMDLimiter）
+# 每分钟最多打开的详情页数量
+DETAIL_RPM = 30
+# 目标延迟（秒）：低于此值逐步提高并发，高于此值或出错时并发减半
+DETAIL_TARGET_LATENCY = 2.5
+
 # ============================================================
 # 工具函数
 # ============================================================
@@ -105,3 +140,8 @@ def ensure_dirs():
     """确保必要目录存在"""
     BROWSER_USER_DATA_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def search_url(keyword: str) -> str:
+    """生成搜索页 URL（关键词做 URL 编码，避免 &、#、空格等字符截断或破坏查询参数）"""
+    return f"{_SEARCH_PRE}{quote(keyword, safe='')}{_SEARCH_POST}"
@@ -3,6 +3,7 @@
 检查文章内容是否符合小红书写作规范：去 AI 味、不捏造事实、情绪自然
 """
 
+import functools
 import json
 import re
 from pathlib import Path
@@ -12,39 +13,182 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时使用标准库 json
+    orjson = None
+
 console = Console()
 
 # 加载写作指南
 _GUIDELINES_PATH = Path(__file__).parent.parent / "resources" / "writing_guidelines.json"
 
+# 检查规则用到的正则（模块加载时编译一次）
+_PRICE_RE = re.compile(r'(\d+\.?\d*)\s*[元块¥￥]|人均\s*(\d+)')
+_EMOJI_RE = re.compile(r'[\U0001F300-\U0001F9FF\u2600-\u26FF\u2700-\u27BF]')
+
+# 正文一次扫描用的合并正则：句末标点 / emoji / 具体时间 / 他人转述，各分支互不重叠
+# 价格与时间都以数字为主体（如「3点68元」），合并后会互相吞掉，价格单独扫描
+_SCAN_RE = re.compile(
+    r'(?P<sent_end>[。！？!?\n])'
+    r'|(?P<emoji>[\U0001F300-\U0001F9FF\u2600-\u26FF\u2700-\u27BF])'
+    r'|(?P<time>(?P<time_prefix>早上|上午|中午|下午|晚上|凌晨)?\s*(?P<hour>\d{1,2})[:\：点](?P<minute>\d{0,2}))'
+    r'|(?P<hearsay>(?P<who>朋友|同事|闺蜜|老公|老婆|室友|同学)\s*(?P<verb>说|推荐|安利|告诉我))'
+)
+
+
+def _count_emoji(text: str) -> int:
+    """统计 emoji 个数（逐个迭代匹配，不构造匹配列表）"""
+    return sum(1 for _ in _EMOJI_RE.finditer(text))
 
+
+@functools.lru_cache(maxsize=1)
 def _load_guidelines() -> dict:
+    """加载写作指南（只读取一次）"""
+    if orjson is not None:
+        return orjson.loads(_GUIDELINES_PATH.read_bytes())
     with open(_GUIDELINES_PATH, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
+@functools.lru_cache(maxsize=8)
+def _compile_forbidden(patterns: tuple[str, ...]):
+    """
+    预编译 AI 感词句匹配器（按模式元组缓存）
+
+    Returns:
+        (simple_re, implied, multipart)
+        simple_re: 所有普通模式合成的一个正则，一次扫描找出全部命中；没有普通模式时为 None
+        implied: 命中串 → 它包含的所有普通模式及其在命中串中的偏移
+            （如命中「废话不多说」同时意味着偏移 1 处的「话不多说」）
+        multipart: 带省略号的模式 → 拆出的关键词元组
+    """
+    simple = sorted({p for p in patterns if p and "…" not in p}, key=len, reverse=True)
+    multipart = {}
+    for pattern in patterns:
+        if "…" in pattern:
+            parts = tuple(p.strip() for p in pattern.split("…") if p.strip())
+            if len(parts) >= 2:
+                multipart[pattern] = parts
+
+    simple_re = None
+    implied = {}
+    if simple:
+        # 零宽前瞻让匹配可以重叠，每个位置优先匹配最长的模式
+        simple_re = re.compile("(?=(" + "|".join(map(re.escape, simple)) + "))")
+        implied = {hit: [(p, hit.find(p)) for p in simple if p in hit] for hit in simple}
+    return simple_re, implied, multipart
+
+
+class _ContentScan:
+    """一篇正文的扫描结果，供事实捏造、情绪密度检查共用，避免每项检查各自遍历全文"""
+
+    def __init__(self):
+        self.times: list[tuple[str, str, str]] = []     # (时段, 时, 分)
+        self.prices: list[tuple[str, str]] = []         # (金额, 人均金额)
+        self.hearsay: list[tuple[str, str]] = []        # (转述人, 动作)
+        self.sentences: list[tuple[str, str]] = []      # (去掉首尾空白、长度 > 2 的句子, 句末标点)
+        self.emoji_count = 0
+
+    def _add_sentence(self, sent: str, end: str = ""):
+        sent = sent.strip()
+        if len(sent) > 2:
+            self.sentences.append((sent, end))
+
+
+def _scan_many(contents: list[str]) -> list[_ContentScan]:
+    """
+    扫描多篇正文：用 \\x00 拼接后整体只跑一遍合并正则，再按位置把命中分配回各篇
+    \\x00 不会被任何分支匹配（也不属于 \\s），命中不会跨篇
+    """
+    scans = [_ContentScan() for _ in contents]
+    if not contents:
+        return scans
+
+    joined = "\x00".join(contents)
+    # 每篇正文在 joined 中的结束位置（即其后分隔符的位置）
+    ends = []
+    pos = 0
+    for content in contents:
+        pos += len(content)
+        ends.append(pos)
+        pos += 1
+
+    doc = 0
+    start = 0   # 当前句子的起点
+    for m in _SCAN_RE.finditer(joined):
+        # 越过的篇目：收尾最后一句，切到下一篇
+        while m.start() > ends[doc]:
+            scans[doc]._add_sentence(joined[start:ends[doc]])
+            start = ends[doc] + 1
+            doc += 1
+        scan = scans[doc]
+
+        kind = m.lastgroup
+        if kind == "sent_end":
+            scan._add_sentence(joined[start:m.start()], m.group())
+            start = m.end()
+        elif kind == "emoji":
+            scan.emoji_count += 1
+        else:
+            if kind == "time":
+                scan.times.append((m["time_prefix"] or "", m["hour"], m["minute"]))
+            else:
+                scan.hearsay.append((m["who"], m["verb"]))
+            # 时间、转述中间的空白可能跨过换行，换行处同样是句子边界
+            nl = joined.find("\n", m.start(), m.end())
+            while nl != -1:
+                scan._add_sentence(joined[start:nl])
+                start = nl + 1
+                nl = joined.find("\n", start, m.end())
+
+    while doc < len(contents):
+        scans[doc]._add_sentence(joined[start:ends[doc]])
+        start = ends[doc] + 1
+        doc += 1
+
+    doc = 0
+    for m in _PRICE_RE.finditer(joined):
+        while m.start() > ends[doc]:
+            doc += 1
+        scans[doc].prices.append(m.groups(default=""))
+
+    return scans
+
+
 class ContentCheckResult:
-    """内容检查结果"""
+    """
+    内容检查结果
+    三个列表在第一次添加时才创建，没有条目时为 None（批量检查时大部分结果只有少量条目）
+    """
+
+    __slots__ = ("warnings", "errors", "suggestions", "score")
 
     def __init__(self):
-        self.warnings: list[dict] = []      # 警告（建议修改）
-        self.errors: list[dict] = []        # 错误（必须修改）
-        self.suggestions: list[str] = []    # 改进建议
-        self.score: int = 100               # 质量评分 0-100
+        self.warnings: Optional[list[dict]] = None      # 警告（建议修改）
+        self.errors: Optional[list[dict]] = None        # 错误（必须修改）
+        self.suggestions: Optional[list[str]] = None    # 改进建议
+        self.score: int = 100                           # 质量评分 0-100
 
     @property
     def passed(self) -> bool:
-        return len(self.errors) == 0
+        return not self.errors
 
     def add_warning(self, rule: str, message: str, context: str = ""):
+        if self.warnings is None:
+            self.warnings = []
         self.warnings.append({"rule": rule, "message": message, "context": context})
         self.score = max(0, self.score - 5)
 
     def add_error(self, rule: str, message: str, context: str = ""):
+        if self.errors is None:
+            self.errors = []
         self.errors.append({"rule": rule, "message": message, "context": context})
         self.score = max(0, self.score - 15)
 
     def add_suggestion(self, suggestion: str):
+        if self.suggestions is None:
+            self.suggestions = []
         self.suggestions.append(suggestion)
 
 
@@ -52,14 +196,24 @@ def check_ai_patterns(content: str, title: str, guidelines: dict) -> list[dict]:
     """检查 AI 感词句"""
     issues = []
     forbidden = guidelines.get("forbidden_patterns", [])
+    simple_re, implied, multipart = _compile_forbidden(tuple(forbidden))
 
     full_text = f"{title} {content}"
 
+    # 一次扫描找出文本中出现的全部普通模式及其首次出现的位置
+    first_pos: dict[str, int] = {}
+    if simple_re:
+        for m in simple_re.finditer(full_text):
+            for p, offset in implied[m.group(1)]:
+                idx = m.start() + offset
+                if idx < first_pos.get(p, idx + 1):
+                    first_pos[p] = idx
+
     for pattern in forbidden:
         # 处理带省略号的模式（如 "首先…其次…最后…"）
         if "…" in pattern:
-            parts = [p.strip() for p in pattern.split("…") if p.strip()]
-            if len(parts) >= 2:
+            parts = multipart.get(pattern)
+            if parts:
                 # 检查文本中是否同时包含这些关键词
                 found_all = all(p in full_text for p in parts)
                 if found_all:
@@ -68,9 +222,9 @@ def check_ai_patterns(content: str, title: str, guidelines: dict) -> list[dict]:
                         "context": pattern,
                     })
         else:
-            if pattern in full_text:
-                # 找到上下文
-                idx = full_text.find(pattern)
+            idx = first_pos.get(pattern)
+            if idx is not None:
+                # 截取上下文
                 start = max(0, idx - 10)
                 end = min(len(full_text), idx + len(pattern) + 10)
                 issues.append({
@@ -86,11 +240,15 @@ def check_fabrication_risk(content: str, user_provided_facts: Optional[dict] = N
     检查可能的事实捏造风险
     识别文中的具体时间、价格、地点等信息，标记为潜在风险
     """
+    return _fabrication_issues(_scan_many([content])[0], user_provided_facts)
+
+
+def _fabrication_issues(scan: _ContentScan, user_provided_facts: Optional[dict] = None) -> list[dict]:
+    """根据正文扫描结果生成事实捏造风险"""
     issues = []
 
     # 检查具体时间（几点钟）
-    time_patterns = re.findall(r'(早上|上午|中午|下午|晚上|凌晨)?\s*(\d{1,2})[:\：点](\d{0,2})', content)
-    for match in time_patterns:
+    for match in scan.times:
         full = "".join(match)
         if user_provided_facts and full in str(user_provided_facts.get("times", [])):
             continue
@@ -101,8 +259,7 @@ def check_fabrication_risk(content: str, user_provided_facts: Optional[dict] = N
         })
 
     # 检查具体价格
-    price_patterns = re.findall(r'(\d+\.?\d*)\s*[元块¥￥]|人均\s*(\d+)', content)
-    for match in price_patterns:
+    for match in scan.prices:
         value = match[0] or match[1]
         if user_provided_facts and value in str(user_provided_facts.get("prices", [])):
             continue
@@ -113,8 +270,7 @@ def check_fabrication_risk(content: str, user_provided_facts: Optional[dict] = N
         })
 
     # 检查"朋友说"、"同事说"等转述
-    hearsay_patterns = re.findall(r'(朋友|同事|闺蜜|老公|老婆|室友|同学)\s*(说|推荐|安利|告诉我)', content)
-    for match in hearsay_patterns:
+    for match in scan.hearsay:
         issues.append({
             "type": "他人转述",
             "value": "".join(match),
@@ -126,14 +282,18 @@ def check_fabrication_risk(content: str, user_provided_facts: Optional[dict] = N
 
 def check_emotion_density(content: str) -> list[dict]:
     """检查情绪表达密度，避免过度密集"""
+    return _emotion_issues(_scan_many([content])[0])
+
+
+def _emotion_issues(scan: _ContentScan) -> list[dict]:
+    """根据正文扫描结果检查情绪表达密度"""
     issues = []
-    sentences = re.split(r'[。！？!?\n]', content)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 2]
 
     consecutive_exclaim = 0
-    for i, sent in enumerate(sentences):
-        # 检查感叹句
-        if sent.endswith("！") or sent.endswith("!") or "啊啊" in sent or "太" in sent and ("了" in sent or "！" in sent):
+    for i, (sent, end) in enumerate(scan.sentences):
+        # 检查感叹句（句末标点在切句时已单独记录，句子文本本身不含「！」）
+        exclaim = end in ("！", "!")
+        if exclaim or "啊啊" in sent or ("太" in sent and ("了" in sent or exclaim)):
             consecutive_exclaim += 1
         else:
             consecutive_exclaim = 0
@@ -147,11 +307,10 @@ def check_emotion_density(content: str) -> list[dict]:
             })
 
     # 检查 emoji 密度
-    emojis = re.findall(r'[\U0001F300-\U0001F9FF\u2600-\u26FF\u2700-\u27BF]', content)
-    if len(emojis) > 10:
+    if scan.emoji_count > 10:
         issues.append({
             "type": "emoji过多",
-            "message": f"检测到 {len(emojis)} 个 emoji，建议控制在 3-6 个，过多会显得刻意",
+            "message": f"检测到 {scan.emoji_count} 个 emoji，建议控制在 3-6 个，过多会显得刻意",
         })
 
     return issues
@@ -178,9 +337,9 @@ def check_title_quality(title: str, guidelines: dict) -> list[dict]:
         issues.append({"type": "标题党", "message": "以'震惊'开头的标题已经被人反感了，换个方式"})
 
     # 检查是否堆砌 emoji
-    title_emojis = re.findall(r'[\U0001F300-\U0001F9FF\u2600-\u26FF\u2700-\u27BF]', title)
-    if len(title_emojis) > 3:
-        issues.append({"type": "标题emoji过多", "message": f"标题中有 {len(title_emojis)} 个 emoji，建议最多 1-2 个"})
+    title_emoji_count = _count_emoji(title)
+    if title_emoji_count > 3:
+        issues.append({"type": "标题emoji过多", "message": f"标题中有 {title_emoji_count} 个 emoji，建议最多 1-2 个"})
 
     return issues
 
@@ -203,6 +362,37 @@ def check_content(
                 "places": ["xxx咖啡馆"],
             }
     """
+    return _check_scanned(title, content, _scan_many([content])[0], user_provided_facts)
+
+
+def check_many(
+    articles: list[tuple[str, str]],
+    user_provided_facts: Optional[dict] = None,
+) -> list[ContentCheckResult]:
+    """
+    批量内容质量检查，所有正文合并后只扫描一遍
+
+    Args:
+        articles: (标题, 正文) 列表
+        user_provided_facts: 同 check_content，对所有文章生效
+
+    Returns:
+        与 articles 一一对应的检查结果
+    """
+    scans = _scan_many([content for _, content in articles])
+    return [
+        _check_scanned(title, content, scan, user_provided_facts)
+        for (title, content), scan in zip(articles, scans)
+    ]
+
+
+def _check_scanned(
+    title: str,
+    content: str,
+    scan: _ContentScan,
+    user_provided_facts: Optional[dict] = None,
+) -> ContentCheckResult:
+    """根据已完成的正文扫描结果执行各项检查"""
     guidelines = _load_guidelines()
     result = ContentCheckResult()
 
@@ -216,7 +406,7 @@ def check_content(
         )
 
     # 2. 事实捏造风险检查
-    fab_issues = check_fabrication_risk(content, user_provided_facts)
+    fab_issues = _fabrication_issues(scan, user_provided_facts)
     for issue in fab_issues:
         result.add_warning(
             "fabrication_risk",
@@ -225,7 +415,7 @@ def check_content(
         )
 
     # 3. 情绪密度检查
-    emo_issues = check_emotion_density(content)
+    emo_issues = _emotion_issues(scan)
     for issue in emo_issues:
         result.add_warning(
             "emotion_density",
@@ -254,8 +444,27 @@ def check_content(
     return result
 
 
-def print_check_result(result: ContentCheckResult):
-    """在终端中打印检查结果"""
+def _print_plain(result: ContentCheckResult, name: str = ""):
+    """非终端输出（管道、重定向）时打印单行 JSON，跳过 rich 表格排版，也便于其他脚本解析"""
+    data = {"file": name} if name else {}
+    print(json.dumps({
+        **data,
+        "score": result.score,
+        "passed": result.passed,
+        "errors": result.errors or [],
+        "warnings": result.warnings or [],
+        "suggestions": result.suggestions or [],
+    }, ensure_ascii=False))
+
+
+def print_check_result(result: ContentCheckResult, name: str = ""):
+    """在终端中打印检查结果（stdout 不是终端时改为每篇输出一行 JSON）"""
+    if not console.is_terminal:
+        _print_plain(result, name)
+        return
+
+    if name:
+        console.print(f"[bold]📄 {name}[/bold]")
 
     # 评分面板
     score_color = "green" if result.score >= 80 else "yellow" if result.score >= 60 else "red"
@@ -301,12 +510,36 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="小红书内容质量检查器")
-    parser.add_argument("--title", "-t", required=True, help="文章标题")
+    parser.add_argument("--title", "-t", help="文章标题")
     parser.add_argument("--content", "-c", help="正文内容")
     parser.add_argument("--content-file", "-f", help="正文文件路径")
+    parser.add_argument("--dir", "-d", help="批量检查目录下所有 .md/.txt 文件（首行为标题）")
 
     args = parser.parse_args()
 
+    if args.dir:
+        files = sorted(
+            p for p in Path(args.dir).iterdir()
+            if p.is_file() and p.suffix in (".md", ".txt")
+        )
+        articles = []
+        for path in files:
+            first_line, _, body = path.read_text(encoding="utf-8").partition("\n")
+            articles.append((first_line.lstrip("#").strip() or path.stem, body.strip()))
+
+        results = check_many(articles)
+        for path, result in zip(files, results):
+            print_check_result(result, path.name)
+
+        failed = sum(1 for r in results if not r.passed)
+        if console.is_terminal:
+            console.print(f"[bold]共检查 {len(results)} 篇，{len(results) - failed} 篇通过，{failed} 篇未通过[/bold]")
+        exit(1 if failed else 0)
+
+    if not args.title:
+        print("请提供 --title（或用 --dir 批量检查）")
+        exit(1)
+
     if args.content_file:
         content = Path(args.content_file).read_text(encoding="utf-8")
     elif args.content:
@@ -318,7 +551,9 @@ if __name__ == "__main__":
     result = check_content(args.title, content)
     print_check_result(result)
 
-    if result.passed:
-        console.print("[green]✅ 内容检查通过[/green]")
-    else:
-        console.print("[red]❌ 内容检查未通过，请修改后重试[/red]")
+    # 非终端时 stdout 只保留 JSON（passed 字段已包含结论）
+    if console.is_terminal:
+        if result.passed:
+            console.print("[green]✅ 内容检查通过[/green]")
+        else:
+            console.print("[red]❌ 内容检查未通过，请修改后重试[/red]")
@@ -0,0 +1,180 @@
+"""
+后台浏览器守护进程
+启动一次浏览器并保持登录态，通过本地 Unix socket 接收发布笔记 / 热门话题任务，
+省去每次运行脚本时 3-5 秒的浏览器冷启动
+
+用法：
+    python scripts/daemon.py        # 启动守护进程，Ctrl+C 退出
+
+守护进程运行期间，publish_article.py / hot_topics.py 会自动把任务交给它执行；
+没有守护进程时照常自行启动浏览器。
+浏览器用户目录被守护进程占用，analyze_articles.py / browser_helper.py 检测到守护进程时会提示并退出。
+
+协议：每个连接发送一行 JSON 请求 {"cmd": "publish" | "trending", "args": {...}}，
+守护进程执行完毕后返回一行 JSON {"ok": bool, "result": ..., "error": str}
+"""
+
+import asyncio
+import json
+
+from rich.console import Console
+from rich.panel import Panel
+
+import config
+from browser_helper import launch_browser, ensure_login, close_browser
+
+console = Console()
+
+# 请求中包含整篇正文，放宽单行读取上限（默认 64KB）
+_LINE_LIMIT = 4 * 1024 * 1024
+
+
+async def daemon_running() -> bool:
+    """守护进程是否正在运行（socket 存在且可以连接）"""
+    if not hasattr(asyncio, "open_unix_connection") or not config.DAEMON_SOCKET.exists():
+        return False
+    try:
+        _, writer = await asyncio.open_unix_connection(str(config.DAEMON_SOCKET))
+    except OSError:
+        # socket 文件残留但守护进程已退出
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+
+async def send_job(cmd: str, **args) -> dict | None:
+    """
+    把任务交给正在运行的守护进程执行，等待完成后返回 {"ok", "result", "error"}
+    没有可用的守护进程（socket 不存在、连接失败、平台不支持 Unix socket）时返回 None，
+    调用方自行启动浏览器；请求发出后通信出错（连接中断、返回内容无法解析）时
+    返回 ok=False 的结果而不是 None — 守护进程可能已在执行任务，不能再本地重复执行
+    """
+    if not hasattr(asyncio, "open_unix_connection") or not config.DAEMON_SOCKET.exists():
+        return None
+    try:
+        reader, writer = await asyncio.open_unix_connection(
+            str(config.DAEMON_SOCKET), limit=_LINE_LIMIT,
+        )
+    except OSError:
+        # socket 文件残留但守护进程已退出
+        return None
+
+    console.print("[dim]检测到后台浏览器，任务交由守护进程执行（进度见守护进程终端）...[/dim]")
+    try:
+        request = {"cmd": cmd, "args": args}
+        writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+        reply = json.loads(line) if line else None
+    except (OSError, ValueError) as e:
+        # 连接中断；或返回行超出上限、不是合法 JSON（均为 ValueError）
+        return {"ok": False, "result": None, "error": f"与守护进程通信失败: {e}"}
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    if reply is None:
+        return {"ok": False, "result": None, "error": "守护进程未返回结果"}
+    return reply
+
+
+async def _run_job(cmd: str, args: dict, context, page):
+    """在已打开的浏览器中执行一个任务，返回任务函数的结果"""
+    # 延迟导入：两个脚本都会导入本模块的 send_job
+    from publish_article import publish
+    from hot_topics import get_trending
+
+    if cmd == "publish":
+        return await publish(**args, context=context, page=page)
+    if cmd == "trending":
+        return await get_trending(**args, context=context, page=page)
+    raise ValueError(f"未知任务: {cmd}")
+
+
+async def serve():
+    """启动浏览器并监听 config.DAEMON_SOCKET，逐个执行收到的任务"""
+    if not hasattr(asyncio, "start_unix_server"):
+        console.print("[red]当前平台不支持 Unix socket，无法启动守护进程[/red]")
+        return
+
+    sock_path = config.DAEMON_SOCKET
+    if await daemon_running():
+        console.print(f"[yellow]守护进程已在运行: {sock_path}[/yellow]")
+        return
+    sock_path.unlink(missing_ok=True)  # 上次异常退出残留的 socket 文件
+
+    context, page = await launch_browser()
+    if not await ensure_login(page):
+        console.print("[red]未能登录，退出[/red]")
+        await close_browser(context)
+        return
+
+    # 同一时间只执行一个任务（共用一个页面）
+    lock = asyncio.Lock()
+
+    async def execute(line: bytes) -> dict:
+        """执行一行 JSON 请求，返回回复"""
+        nonlocal context, page
+        try:
+            request = json.loads(line)
+            cmd = request["cmd"]
+            async with lock:
+                console.print(f"\n[bold blue]📥 收到任务: {cmd}[/bold blue]")
+                # 浏览器窗口被手动关闭时重新启动
+                if page.is_closed():
+                    await close_browser(context)
+                    context, page = await launch_browser()
+                result = await _run_job(cmd, request.get("args", {}), context, page)
+            return {
+                "ok": bool(result),
+                "result": result,
+                "error": None if result else "任务未完成，详见守护进程输出",
+            }
+        except Exception as e:
+            console.print(f"[red]❌ 任务出错: {e}[/red]")
+            return {"ok": False, "result": None, "error": str(e)}
+
+    async def handle(reader, writer):
+        try:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # 请求行超出 _LINE_LIMIT
+                reply = {"ok": False, "result": None, "error": f"请求超出单行上限 {_LINE_LIMIT} 字节"}
+            else:
+                if not line:
+                    # 只探测守护进程是否存活的连接（见 daemon_running），没有请求
+                    return
+                reply = await execute(line)
+            writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        except OSError:
+            pass  # 客户端已断开（连接被重置等）
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=str(sock_path), limit=_LINE_LIMIT)
+    console.print(Panel(
+        f"🛰️ 后台浏览器已就绪\n"
+        f"   监听: {sock_path}\n"
+        f"   publish_article.py / hot_topics.py 将自动复用此浏览器，Ctrl+C 退出",
+        style="bold blue",
+    ))
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sock_path.unlink(missing_ok=True)
+        await close_browser(context)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
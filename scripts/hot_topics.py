@@ -5,9 +5,14 @@
 
 import argparse
 import asyncio
+import functools
+import io
 import json
+import re
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 
 from rich.console import Console
 from rich.panel import Panel
@@ -15,17 +20,76 @@ from rich.table import Table
 
 import config
 from browser_helper import launch_browser, ensure_login, close_browser, navigate_to
+from daemon import send_job
 from utils import (
-    random_delay, extract_text, extract_attribute,
-    parse_count, save_to_json, smooth_scroll, wait_for_any_selector,
+    random_delay, parse_count, save_to_json, smooth_scroll, wait_for_any_selector, split_selectors,
 )
 
 console = Console()
 
+# 笔记文本中的话题标签 #xxx
+_HASHTAG_RE = re.compile(r'#([\u4e00-\u9fffA-Za-z0-9]{2,15})')
 
+# 排行榜前三名的奖牌
+_MEDALS = ("🥇", "🥈", "🥉")
+
+# 数据来源的显示名：Markdown 报告 / 终端表格
+_SOURCE_MAP_REPORT = {
+    "search_trending": "🔍 搜索热搜",
+    "explore_page": "🌟 探索推荐",
+    "feed_analysis": "📊 信息流分析",
+}
+_SOURCE_MAP_TERM = {
+    "search_trending": "搜索热搜",
+    "explore_page": "探索推荐",
+    "feed_analysis": "信息流分析",
+}
+
+
+@functools.lru_cache(maxsize=1)
 def _load_selectors() -> dict:
+    """加载选择器配置（只读取一次，逗号分隔的选择器已拆成元组）"""
     with open(config.SELECTORS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        return split_selectors(json.load(f))
+
+
+# 在卡片内按优先级依次尝试每个字段的备选选择器，一次往返取回所有字段的文本
+# （与逐个 query_selector 的优先级一致；逗号合并的选择器会按文档顺序而非优先级命中）
+_CARD_FIELDS_JS = """
+    (card, fields) => {
+        const out = {};
+        for (const [key, sels] of Object.entries(fields)) {
+            out[key] = '';
+            for (const sel of sels) {
+                const el = card.querySelector(sel);
+                if (el) {
+                    out[key] = (el.textContent || '').trim();
+                    break;
+                }
+            }
+        }
+        const link = card.querySelector('a');
+        out.href = link ? (link.getAttribute('href') || '').trim() : '';
+        return out;
+    }
+"""
+
+
+def _on_home_page(page) -> bool:
+    """当前页面是否已是小红书首页（ensure_login 结束时停留在首页，首页会重定向到 /explore）"""
+    parts = urlsplit(page.url)
+    return (
+        f"{parts.scheme}://{parts.netloc}" == config.XIAOHONGSHU_HOME
+        and parts.path in ("", "/", "/explore")
+    )
+
+
+async def _goto_home(page):
+    """导航到首页；页面已在首页时直接复用，省去一次页面加载和等待"""
+    if _on_home_page(page):
+        return
+    await navigate_to(page, config.XIAOHONGSHU_HOME)
+    await random_delay(*config.PAGE_LOAD_WAIT)
 
 
 async def scrape_explore_topics(page, selectors: dict, count: int) -> list[dict]:
@@ -42,9 +106,10 @@ async def scrape_explore_topics(page, selectors: dict, count: int) -> list[dict]
     await random_delay(*config.PAGE_LOAD_WAIT)
 
     # 尝试从探索页的话题推荐区域抓取
-    topic_card_sels = topic_sels.get("topic_card", ".topic-card, .channel-item, .category-item").split(", ")
-    topic_name_sels = topic_sels.get("topic_name", ".topic-name, .channel-name, .title, span").split(", ")
-    topic_count_sels = topic_sels.get("topic_view_count", ".view-count, .count, .desc").split(", ")
+    topic_card_sels = topic_sels.get("topic_card", (".topic-card", ".channel-item", ".category-item"))
+    topic_name_sels = topic_sels.get("topic_name", (".topic-name", ".channel-name", ".title", "span"))
+    topic_count_sels = topic_sels.get("topic_view_count", (".view-count", ".count", ".desc"))
+    fields = {"name": topic_name_sels, "count": topic_count_sels}
 
     # 先尝试直接获取话题卡片
     for sel in topic_card_sels:
@@ -54,29 +119,15 @@ async def scrape_explore_topics(page, selectors: dict, count: int) -> list[dict]
                 if len(topics) >= count:
                     break
                 try:
-                    name_el = None
-                    for ns in topic_name_sels:
-                        name_el = await card.query_selector(ns)
-                        if name_el:
-                            break
-                    name = await extract_text(name_el, "") if name_el else ""
+                    data = await card.evaluate(_CARD_FIELDS_JS, fields)
+                    name = data["name"]
                     if not name:
                         continue
 
-                    count_el = None
-                    for cs in topic_count_sels:
-                        count_el = await card.query_selector(cs)
-                        if count_el:
-                            break
-                    view_text = await extract_text(count_el, "0") if count_el else "0"
-
-                    link_el = await card.query_selector("a")
-                    href = await extract_attribute(link_el, "href", "") if link_el else ""
-
                     topics.append({
-                        "name": name.strip().lstrip("#"),
-                        "view_count": parse_count(view_text),
-                        "url": href,
+                        "name": name.lstrip("#"),
+                        "view_count": parse_count(data["count"] or "0"),
+                        "url": data["href"],
                         "source": "explore_page",
                     })
                 except Exception:
@@ -98,11 +149,10 @@ async def scrape_trending_from_search(page, selectors: dict, count: int) -> list
 
     console.print("  [cyan]正在获取搜索热词...[/cyan]")
 
-    await navigate_to(page, config.XIAOHONGSHU_HOME)
-    await random_delay(*config.PAGE_LOAD_WAIT)
+    await _goto_home(page)
 
     # 点击搜索框，触发热搜展示
-    search_input_sels = search_sels.get("search_input", "#search-input").split(", ")
+    search_input_sels = search_sels.get("search_input", ("#search-input",))
     search_input = await wait_for_any_selector(page, search_input_sels, timeout=8000)
 
     if search_input:
@@ -112,20 +162,12 @@ async def scrape_trending_from_search(page, selectors: dict, count: int) -> list
         # 抓取热搜列表
         hot_item_sels = trending_sels.get(
             "hot_search_item",
-            ".trending-item, .hot-item, .search-trending-item, .hot-list-item, .hot-word"
-        ).split(", ")
-        hot_name_sels = trending_sels.get(
-            "hot_search_name",
-            ".title, .name, .word, span, a"
-        ).split(", ")
-        hot_rank_sels = trending_sels.get(
-            "hot_search_rank",
-            ".rank, .index, .num"
-        ).split(", ")
-        hot_heat_sels = trending_sels.get(
-            "hot_search_heat",
-            ".hot-score, .heat, .score, .count"
-        ).split(", ")
+            (".trending-item", ".hot-item", ".search-trending-item", ".hot-list-item", ".hot-word"),
+        )
+        hot_name_sels = trending_sels.get("hot_search_name", (".title", ".name", ".word", "span", "a"))
+        hot_rank_sels = trending_sels.get("hot_search_rank", (".rank", ".index", ".num"))
+        hot_heat_sels = trending_sels.get("hot_search_heat", (".hot-score", ".heat", ".score", ".count"))
+        fields = {"name": hot_name_sels, "rank": hot_rank_sels, "heat": hot_heat_sels}
 
         for sel in hot_item_sels:
             items = await page.query_selector_all(sel)
@@ -134,36 +176,16 @@ async def scrape_trending_from_search(page, selectors: dict, count: int) -> list
                     if len(topics) >= count:
                         break
                     try:
-                        # 获取话题名
-                        name_el = None
-                        for ns in hot_name_sels:
-                            name_el = await item.query_selector(ns)
-                            if name_el:
-                                break
-                        name = await extract_text(name_el, "") if name_el else ""
+                        # 一次取回话题名、排名、热度
+                        data = await item.evaluate(_CARD_FIELDS_JS, fields)
+                        name = data["name"]
                         if not name or len(name) < 2:
                             continue
 
-                        # 获取排名
-                        rank_el = None
-                        for rs in hot_rank_sels:
-                            rank_el = await item.query_selector(rs)
-                            if rank_el:
-                                break
-                        rank_text = await extract_text(rank_el, "") if rank_el else ""
-
-                        # 获取热度
-                        heat_el = None
-                        for hs in hot_heat_sels:
-                            heat_el = await item.query_selector(hs)
-                            if heat_el:
-                                break
-                        heat_text = await extract_text(heat_el, "0") if heat_el else "0"
-
                         topics.append({
-                            "name": name.strip(),
-                            "rank": rank_text,
-                            "heat": parse_count(heat_text),
+                            "name": name,
+                            "rank": data["rank"],
+                            "heat": parse_count(data["heat"] or "0"),
                             "source": "search_trending",
                         })
                     except Exception:
@@ -174,6 +196,18 @@ async def scrape_trending_from_search(page, selectors: dict, count: int) -> list
     return topics
 
 
+# 信息流中的 hashtag 链接文本和笔记标题/描述文本（textContent 与 extract_text 一致，且不触发布局）
+_FEED_TEXTS_JS = """
+    () => {
+        const texts = sel => [...document.querySelectorAll(sel)].map(el => (el.textContent || '').trim());
+        return {
+            tags: texts("a[href*='/page/topics/'], .hashtag, .tag-item, a[href*='keyword=']"),
+            texts: texts('.note-item .title, .note-item span, .note-item .desc'),
+        };
+    }
+"""
+
+
 async def scrape_trending_from_feed(page, count: int) -> list[dict]:
     """
     兜底策略：从首页信息流中统计高频话题标签
@@ -181,45 +215,34 @@ async def scrape_trending_from_feed(page, count: int) -> list[dict]:
     """
     console.print("  [cyan]正在分析首页信息流中的热门话题...[/cyan]")
 
-    await navigate_to(page, config.XIAOHONGSHU_HOME)
-    await random_delay(*config.PAGE_LOAD_WAIT)
+    await _goto_home(page)
 
-    tag_counter: dict[str, int] = {}
+    tag_counter: Counter[str] = Counter()
 
     # 多次滚动采集
     for scroll_round in range(8):
-        # 收集页面中所有 hashtag 链接
-        tag_elements = await page.query_selector_all(
-            "a[href*='/page/topics/'], .hashtag, .tag-item, a[href*='keyword=']"
-        )
+        # 一次 evaluate 取回 hashtag 链接和笔记标题/描述的文本，避免逐个元素往返
+        texts = await page.evaluate(_FEED_TEXTS_JS)
 
-        for el in tag_elements:
-            text = await extract_text(el, "")
-            text = text.strip().lstrip("#")
-            if text and len(text) >= 2 and len(text) <= 20:
-                tag_counter[text] = tag_counter.get(text, 0) + 1
+        # 收集页面中所有 hashtag 链接（文本已在浏览器端 trim，只保留 2-20 字的）
+        tag_counter.update(
+            tag for tag in (text.lstrip("#") for text in texts["tags"])
+            if 2 <= len(tag) <= 20
+        )
 
         # 也从笔记标题中提取话题标签 (#xxx)
-        all_text_els = await page.query_selector_all(
-            ".note-item .title, .note-item span, .note-item .desc"
+        tag_counter.update(
+            m.group(1) for text in texts["texts"] for m in _HASHTAG_RE.finditer(text)
         )
-        for el in all_text_els:
-            text = await extract_text(el, "")
-            import re
-            tags_in_text = re.findall(r'#([\u4e00-\u9fffA-Za-z0-9]{2,15})', text)
-            for tag in tags_in_text:
-                tag_counter[tag] = tag_counter.get(tag, 0) + 1
 
         await smooth_scroll(page, distance=600, times=2)
         await random_delay(*config.SCROLL_DELAY)
 
         console.print(f"    [dim]第 {scroll_round + 1}/8 轮扫描，已发现 {len(tag_counter)} 个话题[/dim]")
 
-    # 按出现频次排序
-    sorted_tags = sorted(tag_counter.items(), key=lambda x: x[1], reverse=True)[:count]
-
+    # 按出现频次取前 count 个（most_common 内部用堆，只做部分排序）
     topics = []
-    for rank, (name, freq) in enumerate(sorted_tags, 1):
+    for name, freq in tag_counter.most_common(count):
         topics.append({
             "name": name,
             "frequency": freq,
@@ -232,59 +255,59 @@ async def scrape_trending_from_feed(page, count: int) -> list[dict]:
 
 def generate_trending_report(topics: list[dict], count: int) -> str:
     """生成热门话题排行榜 Markdown 报告"""
-    lines = [
-        f"# 🔥 小红书热门话题排行榜",
-        f"",
-        f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"- **话题数量**: {len(topics)}",
-        f"",
-        f"---",
-        f"",
-    ]
+    buf = io.StringIO()
+    w = buf.write
+
+    w(
+        f"# 🔥 小红书热门话题排行榜\n"
+        f"\n"
+        f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"- **话题数量**: {len(topics)}\n"
+        f"\n"
+        f"---\n"
+        f"\n"
+    )
 
     # 排行表格
-    lines.append("## 排行榜")
-    lines.append("")
-    lines.append("| 排名 | 话题 | 热度 | 数据来源 |")
-    lines.append("|------|------|------|----------|")
+    w("## 排行榜\n")
+    w("\n")
+    w("| 排名 | 话题 | 热度 | 数据来源 |\n")
+    w("|------|------|------|----------|\n")
 
     for i, topic in enumerate(topics[:count], 1):
-        name = topic["name"]
         heat = topic.get("heat", topic.get("frequency", 0))
-        source_map = {
-            "search_trending": "🔍 搜索热搜",
-            "explore_page": "🌟 探索推荐",
-            "feed_analysis": "📊 信息流分析",
-        }
-        source = source_map.get(topic.get("source", ""), "未知")
-
-        # 前三名加火焰 emoji
-        rank_display = f"🥇" if i == 1 else f"🥈" if i == 2 else f"🥉" if i == 3 else f"{i}"
-
-        lines.append(f"| {rank_display} | #{name} | {heat:,} | {source} |")
-
-    lines.append("")
+        source = _SOURCE_MAP_REPORT.get(topic.get("source", ""), "未知")
+        # 前三名加奖牌 emoji
+        rank_display = _MEDALS[i - 1] if i <= 3 else str(i)
+        w(f"| {rank_display} | #{topic['name']} | {heat:,} | {source} |\n")
+    w("\n")
 
     # 创作建议
-    lines.append("## 💡 蹭热点建议")
-    lines.append("")
+    w("## 💡 蹭热点建议\n")
+    w("\n")
     if len(topics) >= 3:
         top3 = [t["name"] for t in topics[:3]]
-        lines.append(f"当前最热话题是 **#{top3[0]}**、**#{top3[1]}**、**#{top3[2]}**。")
-        lines.append("")
-        lines.append("参考方向：")
-        lines.append(f"- 围绕「{top3[0]}」分享你的真实体验或看法")
-        lines.append(f"- 把「{top3[1]}」和你的领域做交叉，找到独特切入点")
-        lines.append(f"- 「{top3[2]}」适合写观点类或故事类笔记")
-    lines.append("")
+        w(
+            f"当前最热话题是 **#{top3[0]}**、**#{top3[1]}**、**#{top3[2]}**。\n"
+            f"\n"
+            f"参考方向：\n"
+            f"- 围绕「{top3[0]}」分享你的真实体验或看法\n"
+            f"- 把「{top3[1]}」和你的领域做交叉，找到独特切入点\n"
+            f"- 「{top3[2]}」适合写观点类或故事类笔记\n"
+        )
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
-async def get_trending(count: int = 20, output: str = None):
+async def get_trending(count: int = 20, output: str = None, context=None, page=None) -> str | None:
     """
     主流程：获取热门话题排行榜
-    使用三级策略：搜索热搜 → 探索页推荐 → 信息流分析
+    三种策略（搜索热搜、探索页推荐、信息流分析）在不同标签页并行执行，
+    结果按此优先级合并去重
+
+    传入已打开的 context/page（daemon.py 使用）时直接复用且不关闭浏览器；
+    否则优先交给正在运行的守护进程，没有守护进程再自行启动浏览器。
+    返回报告路径，未获取到话题时返回 None
     """
     config.ensure_dirs()
     selectors = _load_selectors()
@@ -295,49 +318,58 @@ async def get_trending(count: int = 20, output: str = None):
         style="bold magenta",
     ))
 
-    context, page = await launch_browser()
+    # 已有后台浏览器时交给它执行，省去浏览器冷启动
+    if context is None:
+        reply = await send_job(
+            "trending", count=count, output=str(Path(output).resolve()) if output else None,
+        )
+        if reply is not None:
+            if reply["ok"]:
+                console.print(f"[green]✓ 后台浏览器已生成报告: {reply['result']}[/green]")
+            else:
+                console.print(f"[red]❌ 后台浏览器获取热门话题失败: {reply['error']}[/red]")
+            return reply["result"]
 
-    try:
-        # 检查登录
-        is_logged_in = await check_login_status(page)
-        if not is_logged_in:
-            success = await wait_for_login(page)
-            if not success:
-                console.print("[red]未能登录，退出[/red]")
-                return
+    # 启动浏览器（由调用方传入时直接复用）
+    owns_browser = context is None
+    if owns_browser:
+        context, page = await launch_browser()
 
+    try:
+        # 登录（统一由 browser_helper 处理）
+        logged_in = await ensure_login(page)
+        if not logged_in:
+            console.print("[red]未能登录，退出[/red]")
+            return None
+
+        # 三种策略访问的页面互不依赖，各开一个标签页并行抓取
+        console.print("\n[bold]📍 并行执行: 搜索热搜 / 探索页推荐 / 首页信息流分析[/bold]")
+        page_explore, page_feed = await asyncio.gather(context.new_page(), context.new_page())
+        try:
+            results = await asyncio.gather(
+                scrape_trending_from_search(page, selectors, count),
+                scrape_explore_topics(page_explore, selectors, count),
+                scrape_trending_from_feed(page_feed, count),
+                return_exceptions=True,
+            )
+        finally:
+            await asyncio.gather(page_explore.close(), page_feed.close(), return_exceptions=True)
+
+        # 按优先级合并：搜索热搜 → 探索页推荐 → 信息流分析（兜底）
         all_topics = []
-
-        # 策略 1：搜索热搜
-        console.print("\n[bold]📍 策略 1: 获取搜索热搜[/bold]")
-        trending_topics = await scrape_trending_from_search(page, selectors, count)
-        if trending_topics:
-            console.print(f"  [green]✓ 从搜索热搜获取了 {len(trending_topics)} 个话题[/green]")
-            all_topics.extend(trending_topics)
-        else:
-            console.print("  [yellow]未能从搜索热搜获取话题[/yellow]")
-
-        # 策略 2：探索页推荐
-        if len(all_topics) < count:
-            console.print("\n[bold]📍 策略 2: 获取探索页推荐话题[/bold]")
-            explore_topics = await scrape_explore_topics(page, selectors, count - len(all_topics))
-            if explore_topics:
-                console.print(f"  [green]✓ 从探索页获取了 {len(explore_topics)} 个话题[/green]")
-                all_topics.extend(explore_topics)
+        strategy_names = ("搜索热搜", "探索页", "信息流")
+        for name, topics in zip(strategy_names, results):
+            if isinstance(topics, Exception):
+                console.print(f"  [yellow]⚠ {name}抓取出错: {topics}[/yellow]")
+            elif topics:
+                console.print(f"  [green]✓ 从{name}获取了 {len(topics)} 个话题[/green]")
+                all_topics.extend(topics)
             else:
-                console.print("  [yellow]未能从探索页获取话题[/yellow]")
-
-        # 策略 3：信息流分析（兜底）
-        if len(all_topics) < count:
-            console.print("\n[bold]📍 策略 3: 分析首页信息流热门标签[/bold]")
-            feed_topics = await scrape_trending_from_feed(page, count - len(all_topics))
-            if feed_topics:
-                console.print(f"  [green]✓ 从信息流获取了 {len(feed_topics)} 个话题[/green]")
-                all_topics.extend(feed_topics)
+                console.print(f"  [yellow]未能从{name}获取话题[/yellow]")
 
         if not all_topics:
             console.print("\n[red]❌ 未能获取到任何热门话题[/red]")
-            return
+            return None
 
         # 去重（按话题名）
         seen = set()
@@ -352,7 +384,7 @@ async def get_trending(count: int = 20, output: str = None):
         # 保存原始数据
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         json_path = config.OUTPUT_DIR / f"hot_topics_{timestamp}.json"
-        save_to_json(all_topics, json_path)
+        save_to_json(all_topics, json_path, indent=False)
 
         # 生成报告
         report = generate_trending_report(all_topics, count)
@@ -364,9 +396,11 @@ async def get_trending(count: int = 20, output: str = None):
 
         # 终端展示排行榜
         _print_ranking(all_topics, count)
+        return str(report_path)
 
     finally:
-        await close_browser(context)
+        if owns_browser:
+            await close_browser(context)
 
 
 def _print_ranking(topics: list[dict], count: int):
@@ -377,16 +411,10 @@ def _print_ranking(topics: list[dict], count: int):
     table.add_column("热度", justify="right", style="magenta")
     table.add_column("来源", style="dim", max_width=15)
 
-    source_map = {
-        "search_trending": "搜索热搜",
-        "explore_page": "探索推荐",
-        "feed_analysis": "信息流分析",
-    }
-
     for i, topic in enumerate(topics[:count], 1):
-        rank = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else str(i)
+        rank = _MEDALS[i - 1] if i <= 3 else str(i)
         heat = topic.get("heat", topic.get("frequency", 0))
-        source = source_map.get(topic.get("source", ""), "未知")
+        source = _SOURCE_MAP_TERM.get(topic.get("source", ""), "未知")
         table.add_row(rank, f"#{topic['name']}", f"{heat:,}", source)
 
     console.print()
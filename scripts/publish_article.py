@@ -6,7 +6,9 @@
 
 import argparse
 import asyncio
+import functools
 import json
+import re
 from pathlib import Path
 
 from rich.console import Console
@@ -16,15 +18,25 @@ from rich.prompt import Confirm
 import config
 from browser_helper import launch_browser, ensure_login, close_browser, navigate_to
 from content_checker import check_content, print_check_result
-from utils import random_delay, human_type, safe_click, wait_for_any_selector
+from daemon import send_job
+from utils import (
+    random_delay, human_type, type_in_bursts, safe_click, wait_for_any_selector, split_selectors,
+)
 
 console = Console()
 
+# Markdown 语法标记（_read_content_file 使用）
+_MD_HEADER_RE = re.compile(r'^#{1,6}\s+', re.MULTILINE)
+_MD_BOLD_RE = re.compile(r'\*{1,3}(.*?)\*{1,3}')
+_MD_LINK_RE = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+_MD_IMG_RE = re.compile(r'!\[([^\]]*)\]\([^\)]+\)')
 
+
+@functools.lru_cache(maxsize=1)
 def _load_selectors() -> dict:
-    """加载选择器配置"""
+    """加载选择器配置（只读取一次，逗号分隔的选择器已拆成元组）"""
     with open(config.SELECTORS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        return split_selectors(json.load(f))
 
 
 def _read_content_file(filepath: str) -> str:
@@ -45,14 +57,13 @@ def _read_content_file(filepath: str) -> str:
             content = parts[2].strip()
 
     # 去掉 Markdown 标题标记
-    import re
-    content = re.sub(r'^#{1,6}\s+', '', content, flags=re.MULTILINE)
+    content = _MD_HEADER_RE.sub('', content)
     # 去掉加粗/斜体标记
-    content = re.sub(r'\*{1,3}(.*?)\*{1,3}', r'\1', content)
+    content = _MD_BOLD_RE.sub(r'\1', content)
+    # 去掉图片标记（须在链接之前，否则 ![alt](url) 会被链接规则处理成 !alt）
+    content = _MD_IMG_RE.sub('', content)
     # 去掉链接，保留文本
-    content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)
-    # 去掉图片标记
-    content = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', '', content)
+    content = _MD_LINK_RE.sub(r'\1', content)
 
     return content.strip()
 
@@ -61,7 +72,7 @@ async def fill_title(page, title: str, selectors: dict):
     """填写笔记标题"""
     console.print(f"  [cyan]填写标题: {title}[/cyan]")
 
-    title_sels = selectors["publish"]["title_input"].split(", ")
+    title_sels = selectors["publish"]["title_input"]
     title_el = await wait_for_any_selector(page, title_sels, timeout=10000)
 
     if title_el:
@@ -82,31 +93,17 @@ async def fill_content(page, content: str, selectors: dict):
     """填写笔记正文"""
     console.print(f"  [cyan]填写正文 ({len(content)} 字)...[/cyan]")
 
-    content_sels = selectors["publish"]["content_input"].split(", ")
+    content_sels = selectors["publish"]["content_input"]
     content_el = await wait_for_any_selector(page, content_sels, timeout=10000)
 
     if content_el:
         await content_el.click()
         await random_delay(0.3, 0.6)
 
-        # 分段输入正文（避免一次性输入大量文本被检测）
-        paragraphs = content.split("\n")
-        for i, para in enumerate(paragraphs):
-            para = para.strip()
-            if not para:
-                await page.keyboard.press("Enter")
-                await random_delay(0.1, 0.3)
-                continue
-
-            # 逐字输入
-            for char in para:
-                await page.keyboard.type(char)
-                await asyncio.sleep(0.02 + 0.08 * (hash(char) % 10) / 10)
-
-            # 段落之间按回车
-            if i < len(paragraphs) - 1:
-                await page.keyboard.press("Enter")
-                await random_delay(0.2, 0.5)
+        # 逐字输入整篇正文：换行符由 Playwright 按回车键输入；
+        # 按几个到几十个字一段输入，每段重新随机按键间隔，标点和换行后稍作停顿
+        text = "\n".join(line.strip() for line in content.split("\n"))
+        await type_in_bursts(page, text, char_delay=(0.02, 0.1), burst=(3, 30))
 
         console.print("  [green]✓ 正文已填写[/green]")
     else:
@@ -121,7 +118,9 @@ async def add_tags(page, tags: list[str], selectors: dict):
 
     console.print(f"  [cyan]添加标签: {', '.join(tags)}[/cyan]")
 
-    tag_input_sels = selectors["publish"]["tag_input"].split(", ")
+    tag_input_sels = selectors["publish"]["tag_input"]
+    content_sels = selectors["publish"]["content_input"]
+    suggestion_sels = selectors["publish"]["tag_suggestion"]
 
     for tag in tags:
         tag = tag.strip().lstrip("#")
@@ -130,7 +129,6 @@ async def add_tags(page, tags: list[str], selectors: dict):
 
         try:
             # 在正文中输入 # 号触发话题选择
-            content_sels = selectors["publish"]["content_input"].split(", ")
             content_el = await wait_for_any_selector(page, content_sels, timeout=5000)
 
             if content_el:
@@ -147,9 +145,10 @@ async def add_tags(page, tags: list[str], selectors: dict):
                 await page.keyboard.type(tag)
                 await random_delay(1, 2)
 
-                # 尝试点击话题建议
-                suggestion_sels = selectors["publish"]["tag_suggestion"].split(", ")
-                suggestion = await wait_for_any_selector(page, suggestion_sels, timeout=3000)
+                # 尝试点击话题建议（短超时：没有建议时不必长时间等待）
+                suggestion = await wait_for_any_selector(
+                    page, suggestion_sels, timeout=config.TAG_SUGGESTION_TIMEOUT,
+                )
                 if suggestion:
                     await suggestion.click()
                     await random_delay(0.5, 1.0)
@@ -178,8 +177,9 @@ async def upload_cover(page, cover_path: str, selectors: dict):
 
     console.print(f"  [cyan]上传封面图: {path.name}[/cyan]")
 
-    upload_sels = selectors["publish"]["cover_upload"].split(", ")
-    upload_el = await wait_for_any_selector(page, upload_sels, timeout=10000)
+    upload_sels = selectors["publish"]["cover_upload"]
+    # 文件输入框通常是隐藏的，只要求存在于 DOM 中
+    upload_el = await wait_for_any_selector(page, upload_sels, timeout=10000, state="attached")
 
     if upload_el:
         await upload_el.set_input_files(str(path))
@@ -193,10 +193,10 @@ async def click_publish_or_draft(page, selectors: dict, draft: bool = False):
     """点击发布或保存草稿"""
     if draft:
         console.print("  [cyan]保存为草稿...[/cyan]")
-        btn_sels = selectors["publish"]["draft_button"].split(", ")
+        btn_sels = selectors["publish"]["draft_button"]
     else:
         console.print("  [cyan]准备发布...[/cyan]")
-        btn_sels = selectors["publish"]["publish_button"].split(", ")
+        btn_sels = selectors["publish"]["publish_button"]
 
     btn = await wait_for_any_selector(page, btn_sels, timeout=10000)
     if btn:
@@ -205,7 +205,7 @@ async def click_publish_or_draft(page, selectors: dict, draft: bool = False):
         await random_delay(2, 3)
 
         # 处理可能的确认弹窗
-        confirm_sels = selectors["publish"]["confirm_dialog_ok"].split(", ")
+        confirm_sels = selectors["publish"]["confirm_dialog_ok"]
         confirm = await wait_for_any_selector(page, confirm_sels, timeout=3000)
         if confirm:
             await confirm.click()
@@ -226,10 +226,16 @@ async def publish(
     draft: bool = False,
     skip_check: bool = False,
     user_facts: dict = None,
-):
+    context=None,
+    page=None,
+) -> bool:
     """
     主发布流程
     发布前自动执行内容质量检查
+
+    传入已打开的 context/page（daemon.py 使用）时直接复用且不关闭浏览器；
+    否则优先交给正在运行的守护进程，没有守护进程再自行启动浏览器。
+    返回是否完成发布/保存草稿
     """
     config.ensure_dirs()
     selectors = _load_selectors()
@@ -258,28 +264,42 @@ async def publish(
                 "   请修改后重试，或使用 --skip-check 跳过检查",
                 style="red",
             ))
-            return
+            return False
 
         if check_result.warnings:
             console.print("[yellow]⚠️ 存在一些警告，建议优化后再发布[/yellow]")
             proceed = Confirm.ask("是否继续发布？", default=True)
             if not proceed:
                 console.print("[dim]已取消发布[/dim]")
-                return
+                return False
 
         console.print("[green]✅ 内容质量检查通过[/green]\n")
 
-    # 启动浏览器
-    context, page = await launch_browser()
+    # 已有后台浏览器时交给它执行（内容检查已在本地完成），省去浏览器冷启动
+    if context is None:
+        reply = await send_job(
+            "publish", title=title, content=content, tags=tags,
+            cover=str(Path(cover).resolve()) if cover else None,
+            draft=draft, skip_check=True,
+        )
+        if reply is not None:
+            if reply["ok"]:
+                console.print(f"[green]✅ 后台浏览器已完成{action}[/green]")
+            else:
+                console.print(f"[red]❌ 后台浏览器{action}失败: {reply['error']}[/red]")
+            return reply["ok"]
+
+    # 启动浏览器（由调用方传入时直接复用）
+    owns_browser = context is None
+    if owns_browser:
+        context, page = await launch_browser()
 
     try:
-        # 检查登录
-        is_logged_in = await check_login_status(page)
-        if not is_logged_in:
-            success = await wait_for_login(page)
-            if not success:
-                console.print("[red]未能登录，退出[/red]")
-                return
+        # 登录（统一由 browser_helper 处理）
+        logged_in = await ensure_login(page)
+        if not logged_in:
+            console.print("[red]未能登录，退出[/red]")
+            return False
 
         # 导航到发布页面
         console.print("\n[cyan]正在打开发布页面...[/cyan]")
@@ -318,15 +338,18 @@ async def publish(
             f"   请在小红书 App 或 Web 端确认",
             style="green",
         ))
+        return True
 
     except Exception as e:
         console.print(f"\n[red]❌ {action}过程中出错: {e}[/red]")
         console.print("[yellow]提示: 请检查浏览器中的页面状态[/yellow]")
+        return False
 
     finally:
-        # 稍等一下，让用户看到结果
-        await asyncio.sleep(2)
-        await close_browser(context)
+        if owns_browser:
+            # 稍等一下，让用户看到结果
+            await asyncio.sleep(2)
+            await close_browser(context)
 
 
 # ============================================================
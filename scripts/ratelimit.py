@@ -0,0 +1,100 @@
+"""
+自适应限速器
+按请求延迟动态调整并发（AIMD：延迟正常时加性增加，变慢或出错时乘性减少），
+同时用滑动窗口限制每分钟请求数，替代固定的随机延时
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class AIMDLimiter:
+    """
+    AIMD 并发控制 + 滑动窗口 RPM 限制
+
+    并发上限 c 的更新规则：
+        延迟 <= target_latency → c = min(max_concurrency, c + alpha)
+        延迟 >  target_latency → c = max(min_concurrency, c * beta)
+        出错（超时、验证页等） → c = max(min_concurrency, c * beta)
+
+    用法：
+        async with limiter:
+            t0 = time.monotonic()
+            ...  # 发起请求
+            await limiter.record_latency(time.monotonic() - t0)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rpm: int,
+        target_latency: float = 2.5,
+        alpha: float = 0.5,
+        beta: float = 0.5,
+        min_concurrency: int = 1,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.rpm = rpm
+        self.target_latency = target_latency
+        self.alpha = alpha
+        self.beta = beta
+        self.concurrency: float = float(max_concurrency)
+
+        self._in_flight = 0
+        self._timestamps: deque[float] = deque()  # 最近 60 秒内的请求时间
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        """等待直到并发和 RPM 都有余量，然后占用一个名额"""
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= 60:
+                    self._timestamps.popleft()
+
+                rpm_full = len(self._timestamps) >= self.rpm
+                if not rpm_full and self._in_flight < int(self.concurrency):
+                    break
+
+                # RPM 已满时等到窗口中最早的请求过期；否则等其他请求释放
+                timeout = 60 - (now - self._timestamps[0]) if rpm_full else None
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            self._in_flight += 1
+            self._timestamps.append(now)
+
+    async def release(self):
+        """释放一个名额"""
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    async def record_latency(self, latency: float):
+        """
+        记录一次成功请求的耗时（秒）
+        并发上限变化后唤醒 acquire 中的等待者，上限提高时立即放行，不必等下一次 release
+        """
+        async with self._cond:
+            if latency <= self.target_latency:
+                self.concurrency = min(self.max_concurrency, self.concurrency + self.alpha)
+            else:
+                self.concurrency = max(self.min_concurrency, self.concurrency * self.beta)
+            self._cond.notify_all()
+
+    async def record_error(self):
+        """记录一次失败（超时、限流、验证页），并发减半"""
+        async with self._cond:
+            self.concurrency = max(self.min_concurrency, self.concurrency * self.beta)
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
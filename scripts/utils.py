@@ -10,10 +10,30 @@ import re
 from pathlib import Path
 from typing import Optional
 
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from rich.console import Console
 
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时使用标准库 json
+    orjson = None
+
 console = Console()
 
+# parse_count 使用的正则（模块级预编译）
+_SEP_RE = re.compile(r'[,\s]')
+_NON_NUM_RE = re.compile(r'[^0-9.]')
+
+# parse_count 的单位后缀：(后缀字符, 删除这些字符的转换表, 倍数)，按顺序匹配
+# 大小写都列出，无需先 lower() 复制一份字符串
+_SUFFIX_MUL = tuple(
+    (chars, str.maketrans("", "", chars), mul)
+    for chars, mul in (("万wW", 10000), ("千kK", 1000), ("亿", 100000000))
+)
+
+# type_in_bursts 在这些字符之后停顿（标点、换行）
+_PAUSE_CHARS = frozenset("。！？，、；：…,.!?;:\n")
+
 
 async def random_delay(min_s: float = 1, max_s: float = 3):
     """随机等待，模拟人工操作节奏"""
@@ -21,19 +41,41 @@ async def random_delay(min_s: float = 1, max_s: float = 3):
     await asyncio.sleep(delay)
 
 
+async def type_in_bursts(
+    page, text: str, char_delay: tuple = (0.05, 0.15), burst: tuple = (2, 8), pause: tuple = (0.2, 0.6),
+):
+    """
+    把文本切成随机长度的短段依次输入，每段重新抽取按键间隔
+    同一段内的间隔由 Playwright 逐键执行，段与段之间节奏不同，不会形成固定的打字频率
+    段内遇到标点或换行时在其后结束本段，并额外停顿一下
+
+    Args:
+        char_delay: 按键间隔范围（秒），每段抽取一次
+        burst: 每段字符数范围
+        pause: 标点、换行后的停顿范围（秒）
+    """
+    pos = 0
+    while pos < len(text):
+        end = min(pos + random.randint(*burst), len(text))
+        end = next((i + 1 for i in range(pos, end) if text[i] in _PAUSE_CHARS), end)
+        await page.keyboard.type(text[pos:end], delay=random.uniform(*char_delay) * 1000)
+        if text[end - 1] in _PAUSE_CHARS:
+            await random_delay(*pause)
+        pos = end
+
+
 async def human_type(page, selector: str, text: str, char_delay: tuple = (0.05, 0.15)):
     """
     模拟人工逐字输入
-    每个字符之间随机延迟，避免被检测为自动化输入
+    每个字符之间有按键间隔，避免被检测为自动化输入
+    按几个字符一段输入，每段使用新的随机间隔（见 type_in_bursts）
     """
     element = await page.wait_for_selector(selector, timeout=10000)
     await element.click()
     await random_delay(0.3, 0.6)
 
-    for char in text:
-        await page.keyboard.type(char)
-        await asyncio.sleep(random.uniform(*char_delay))
-    
+    await type_in_bursts(page, text, char_delay)
+
     console.print(f"  [dim]已输入文本: {text[:30]}{'...' if len(text) > 30 else ''}[/dim]")
 
 
@@ -81,6 +123,21 @@ async def extract_attribute(element, attr: str, default: str = "") -> str:
         return default
 
 
+def split_selectors(tree):
+    """
+    递归地把 selectors.json 中逗号分隔的选择器字符串拆成元组
+    以 _ 开头的键（如 _comment）原样保留
+    """
+    if isinstance(tree, dict):
+        return {
+            key: value if key.startswith("_") else split_selectors(value)
+            for key, value in tree.items()
+        }
+    if isinstance(tree, str):
+        return tuple(s for s in tree.split(", ") if s)
+    return tree
+
+
 def parse_count(text: str) -> int:
     """
     解析数量文本为整数
@@ -88,32 +145,38 @@ def parse_count(text: str) -> int:
     """
     if not text:
         return 0
-    
-    text = text.strip().lower()
-    text = re.sub(r'[,\s]', '', text)
+
+    text = _SEP_RE.sub('', text)
 
     try:
-        if '万' in text or 'w' in text:
-            num = float(re.sub(r'[万w]', '', text))
-            return int(num * 10000)
-        elif '千' in text or 'k' in text:
-            num = float(re.sub(r'[千k]', '', text))
-            return int(num * 1000)
-        elif '亿' in text:
-            num = float(text.replace('亿', ''))
-            return int(num * 100000000)
-        else:
-            return int(float(re.sub(r'[^0-9.]', '', text) or '0'))
+        for chars, strip_table, mul in _SUFFIX_MUL:
+            if any(c in text for c in chars):
+                return int(float(text.translate(strip_table)) * mul)
+        return int(float(_NON_NUM_RE.sub('', text) or '0'))
     except (ValueError, TypeError):
         return 0
 
 
-def save_to_json(data, filepath: str | Path):
-    """保存数据到 JSON 文件"""
+def save_to_json(data, filepath: str | Path, indent: bool = True):
+    """
+    保存数据到 JSON 文件
+    indent=False 输出紧凑格式（体积更小、序列化更快），适合只供程序读取的文件
+    """
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # orjson 直接序列化为 UTF-8 字节，比标准库快且不产生中间字符串
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        payload = orjson.dumps(data, option=option)
+    else:
+        # 标准库只有不缩进时才走 C 编码器
+        payload = json.dumps(
+            data, ensure_ascii=False,
+            indent=2 if indent else None,
+            separators=None if indent else (",", ":"),
+        ).encode("utf-8")
+    # 一次写入整个文件
+    filepath.write_bytes(payload)
     console.print(f"  [green]数据已保存: {filepath}[/green]")
 
 
@@ -123,6 +186,9 @@ def load_from_json(filepath: str | Path) -> Optional[dict | list]:
     if not filepath.exists():
         console.print(f"  [yellow]文件不存在: {filepath}[/yellow]")
         return None
+    if orjson is not None:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
     with open(filepath, 'r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -138,25 +204,49 @@ async def smooth_scroll(page, distance: int = 300, times: int = 3, delay: tuple
         await asyncio.sleep(random.uniform(*delay))
 
 
-async def wait_for_any_selector(page, selectors: list[str], timeout: int = 10000):
+async def wait_for_any_selector(
+    page, selectors: str | list[str] | tuple[str, ...], timeout: int = 10000, state: str = "visible",
+):
     """
     等待多个选择器中的任意一个出现
     用于处理页面元素不确定的情况（多个备选选择器）
+    所有备选合并成一个选择器同时等待，耗时取决于最先出现的那个，而不是逐个超时
+
+    Args:
+        selectors: 选择器列表/元组，或 selectors.json 中逗号分隔的字符串
+        state: "visible" 等待可见；"attached" 只要求元素已在 DOM 中（更快，适合只读取文本）
     """
+    if isinstance(selectors, str):
+        selectors = split_selectors(selectors)
     combined = ", ".join(selectors)
     try:
-        element = await page.wait_for_selector(combined, timeout=timeout)
+        element = await page.wait_for_selector(combined, timeout=timeout, state=state)
         return element
+    except PlaywrightTimeoutError:
+        # 都没有在超时内出现：并发地逐个查询一次（单次往返耗时），按备选顺序取第一个
+        found = await asyncio.gather(
+            *(page.query_selector(sel) for sel in selectors), return_exceptions=True,
+        )
+        return next((el for el in found if el and not isinstance(el, Exception)), None)
     except Exception:
-        # 逐个尝试
-        for sel in selectors:
-            try:
-                element = await page.query_selector(sel)
+        # 合并后的选择器无法执行（如某个备选用了浏览器不支持的 :contains），会立即报错而不是等待：
+        # 改为各备选并发等待，取最先出现的，其余取消
+        tasks = [
+            asyncio.create_task(page.wait_for_selector(sel, timeout=timeout, state=state))
+            for sel in selectors
+        ]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                try:
+                    element = await fut
+                except Exception:
+                    continue
                 if element:
                     return element
-            except Exception:
-                continue
-        return None
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 def truncate_text(text: str, max_length: int = 100) -> str: